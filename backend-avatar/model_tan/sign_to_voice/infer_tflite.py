@@ -0,0 +1,76 @@
+# infer_tflite.py
+import json, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "signbot"))
+from preprocess import preprocess
+
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:  # full TensorFlow install
+    import tensorflow as tf
+    Interpreter = tf.lite.Interpreter
+
+
+class TFLiteRecognizer:
+    """
+    Same interface as signbot's Recognizer, backed by the .tflite file from model_train.py.
+    Expects <model>.labels.json (written by model_train.py) next to the .tflite file.
+    """
+    def __init__(self, model_path, labels_path=None, num_threads=1):
+        base = model_path[:-len(".tflite")] if model_path.endswith(".tflite") else model_path
+        with open(labels_path or base + ".labels.json") as f:
+            meta = json.load(f)
+        self.label_classes = meta["label_classes"]
+        self.seq_len = meta["seq_len"]
+        self.preprocess_cfg = meta.get("preprocess")
+        self.raw_keypoint_dim = meta.get("raw_keypoint_dim", meta["keypoint_dim"])
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        inp = self.interpreter.get_input_details()[0]
+        self._input_index = inp["index"]
+        self._input_dtype = inp["dtype"]
+        self._input_quant = inp.get("quantization", (0.0, 0))
+        out = self.interpreter.get_output_details()[0]
+        self._output_index = out["index"]
+        self._output_quant = out.get("quantization", (0.0, 0))
+
+    def _resample(self, arr):
+        T = arr.shape[0]
+        if T == self.seq_len:
+            return arr
+        if T < 2:
+            return np.repeat(arr, self.seq_len, axis=0)[:self.seq_len]
+        idx = np.linspace(0, T - 1, self.seq_len).astype(int)
+        return arr[idx]
+
+    def predict(self, keypoints_sequence):
+        """
+        keypoints_sequence: np.array shape (T, D) or list
+        returns: (label, confidence, probs)
+        """
+        arr = self._resample(np.asarray(keypoints_sequence, dtype=np.float32))
+        arr = preprocess(arr, self.preprocess_cfg)[None]
+        scale, zero = self._input_quant
+        if self._input_dtype != np.float32 and scale:
+            arr = np.round(arr / scale + zero).astype(self._input_dtype)
+        self.interpreter.set_tensor(self._input_index, arr)
+        self.interpreter.invoke()
+        probs = self.interpreter.get_tensor(self._output_index)[0]
+        scale, zero = self._output_quant
+        if probs.dtype != np.float32 and scale:
+            probs = (probs.astype(np.float32) - zero) * scale
+        idx = int(probs.argmax())
+        return self.label_classes[idx], float(probs[idx]), probs
+
+
+# quick test + latency (compare against signbot with: python ../signbot/benchmark.py --tflite ...)
+if __name__ == "__main__":
+    r = TFLiteRecognizer(sys.argv[1])
+    dim = r.raw_keypoint_dim
+    sample = np.random.randn(r.seq_len, dim).astype(np.float32)
+    label, conf, _ = r.predict(sample)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        r.predict(sample)
+    print("Predicted:", label, conf, f"avg latency {(time.perf_counter() - t0) * 10:.2f}ms")
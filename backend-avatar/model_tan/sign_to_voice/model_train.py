@@ -1,9 +1,27 @@
 # model_train.py
+"""
+Trains the Keras LSTM sign model on the same packed keypoint format as signbot:
+manifest CSV with columns file,label where each file is an .npz holding 'keypoints' (T, D).
+
+  python model_train.py --train-csv ../signbot/data/manifest_train.csv \
+      --val-csv ../signbot/data/manifest_val.csv --out sign_model --tflite float16
+  python model_train.py --dummy          # old random-data smoke test
+
+Writes <out>.keras, <out>.labels.json and (with --tflite) <out>.tflite for infer_tflite.py.
+"""
+import argparse, csv, json, os, sys
 import numpy as np
+import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.optimizers import Adam
 
+# keypoint preprocessing is shared with signbot so both stacks see identical features
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "signbot"))
+from preprocess import make_config, output_dim, preprocess
+
+AUTOTUNE = tf.data.AUTOTUNE
+
 # Toy training script: makes a model that maps sequences of keypoints -> 5 classes
 def make_dummy_data(num_samples=200, seq_len=20, keypoint_dim=63):
     X = np.random.randn(num_samples, seq_len, keypoint_dim).astype(np.float32)
@@ -20,12 +38,117 @@ def build_model(seq_len=20, keypoint_dim=63, num_classes=5):
     model.compile(optimizer=Adam(1e-3), loss='sparse_categorical_crossentropy', metrics=['accuracy'])
     return model
 
+# ---------- real data (signbot manifest + .npz format) ----------
+def read_manifest(manifest_csv):
+    files, labels = [], []
+    base = os.path.dirname(os.path.abspath(manifest_csv))
+    with open(manifest_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            path = row["file"]
+            files.append(path if os.path.isabs(path) or os.path.exists(path) else os.path.join(base, path))
+            labels.append(row["label"])
+    return files, labels
+
+def resample(seq, seq_len):
+    # same nearest-index resampling as signbot KeypointDataset / Recognizer
+    T = seq.shape[0]
+    if T == seq_len:
+        return seq
+    if T < 2:
+        return np.repeat(seq, seq_len, axis=0)[:seq_len]
+    idx = np.linspace(0, T - 1, seq_len).astype(np.int32)
+    return seq[idx]
+
+def make_dataset(files, label_ids, seq_len, keypoint_dim, batch_size, shuffle=False, cache="", preprocess_cfg=None):
+    """
+    tf.data pipeline: parallel .npz decode + resample + preprocess.py features
+    (keypoint_dim is the feature size after preprocessing), cached after the first epoch
+    (in memory, or on disk when cache is a path), then shuffled, batched and prefetched.
+    """
+    def _load(path):
+        arr = np.load(path.decode() if isinstance(path, bytes) else path)["keypoints"].astype(np.float32)
+        return preprocess(resample(arr, seq_len), preprocess_cfg)
+
+    def _map(path, label):
+        x = tf.numpy_function(_load, [path], tf.float32)
+        x.set_shape((seq_len, keypoint_dim))
+        return x, label
+
+    ds = tf.data.Dataset.from_tensor_slices((files, np.asarray(label_ids, dtype=np.int32)))
+    ds = ds.map(_map, num_parallel_calls=AUTOTUNE).cache(cache)
+    if shuffle:
+        ds = ds.shuffle(min(len(files), 4096), reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(AUTOTUNE)
+
+# ---------- TFLite export ----------
+def export_tflite(model, out_path, quantize="float16", representative_ds=None):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    # LSTM may need select TF ops depending on the TF version
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    if quantize == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if representative_ds is not None:
+            def representative():
+                for x, _ in representative_ds.unbatch().batch(1).take(200):
+                    yield [x]
+            converter.representative_dataset = representative
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    print("Saved TFLite model to", out_path)
+
+def train(args):
+    if args.dummy:
+        X, y = make_dummy_data(500, args.seq_len, args.keypoint_dim)
+        label_classes = [str(i) for i in range(5)]
+        keypoint_dim = raw_dim = args.keypoint_dim
+        preprocess_cfg = None
+        model = build_model(args.seq_len, keypoint_dim, len(label_classes))
+        model.fit(X, y, epochs=args.epochs, batch_size=args.batch_size, validation_split=0.1)
+        train_ds = tf.data.Dataset.from_tensor_slices((X, y)).batch(args.batch_size)
+    else:
+        train_files, train_labels = read_manifest(args.train_csv)
+        val_files, val_labels = read_manifest(args.val_csv)
+        label_classes = sorted(set(train_labels))
+        label_map = {lab: i for i, lab in enumerate(label_classes)}
+        raw_dim = np.load(train_files[0])["keypoints"].shape[1]
+        preprocess_cfg = make_config(raw_dim, normalize=args.normalize, velocity=args.velocity, drop=args.drop)
+        keypoint_dim = output_dim(preprocess_cfg, raw_dim)
+        train_ds = make_dataset(train_files, [label_map[l] for l in train_labels], args.seq_len, keypoint_dim,
+                                args.batch_size, shuffle=True, cache=args.cache, preprocess_cfg=preprocess_cfg)
+        val_ds = make_dataset(val_files, [label_map[l] for l in val_labels], args.seq_len, keypoint_dim,
+                              args.batch_size * 2, preprocess_cfg=preprocess_cfg)
+        model = build_model(args.seq_len, keypoint_dim, len(label_classes))
+        model.fit(train_ds, validation_data=val_ds, epochs=args.epochs)
+
+    model.save(args.out + ".keras")
+    with open(args.out + ".labels.json", "w") as f:
+        json.dump({"label_classes": label_classes, "seq_len": args.seq_len, "keypoint_dim": int(keypoint_dim),
+                   "raw_keypoint_dim": int(raw_dim), "preprocess": preprocess_cfg}, f)
+    print("Saved", args.out + ".keras")
+    if args.tflite:
+        export_tflite(model, args.out + ".tflite", quantize=args.tflite, representative_ds=train_ds)
+
 if __name__ == "__main__":
-    seq_len = 20
-    keypoint_dim = 21*3  # MediaPipe hands single-hand flattened (21 landmarks * 3 coords)
-    num_classes = 5
-    X, y = make_dummy_data(500, seq_len, keypoint_dim)
-    model = build_model(seq_len, keypoint_dim, num_classes)
-    model.fit(X, y, epochs=4, batch_size=32, validation_split=0.1)
-    model.save("sign_model.h5")
-    print("Saved sign_model.h5 (dummy model). Replace with your trained model when ready.")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--train-csv")
+    parser.add_argument("--val-csv")
+    parser.add_argument("--dummy", action="store_true", help="train on random data (smoke test)")
+    parser.add_argument("--seq-len", type=int, default=20)
+    parser.add_argument("--keypoint-dim", type=int, default=21*3, help="only used with --dummy")  # one MediaPipe hand
+    parser.add_argument("--epochs", type=int, default=None, help="default: 4 with --dummy, 30 otherwise")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--normalize", action="store_true", help="center/scale keypoints (see signbot/preprocess.py)")
+    parser.add_argument("--velocity", action="store_true", help="append frame-to-frame velocity features")
+    parser.add_argument("--drop", nargs="*", default=[], help="landmark groups to drop, e.g. lower_body face")
+    parser.add_argument("--cache", default="", help="tf.data cache file (default: in memory)")
+    parser.add_argument("--tflite", choices=["float32", "float16", "int8"], help="also export a TFLite model")
+    parser.add_argument("--out", default="sign_model")
+    args = parser.parse_args()
+    if not args.dummy and not (args.train_csv and args.val_csv):
+        parser.error("--train-csv and --val-csv are required unless --dummy is given")
+    if args.epochs is None:
+        args.epochs = 4 if args.dummy else 30
+    train(args)
@@ -0,0 +1,269 @@
+# server/benchmark.py
+"""
+Latency / throughput benchmark for the sign recognition stack.
+
+Backends:
+  eager        Recognizer.predict (batch 1) / Recognizer.model forward (batch > 1)
+  torchscript  model saved by export_torchscript.py
+  onnx         model saved by export_onnx.py (onnxruntime)
+  tflite       sign_to_voice LSTM exported by sign_to_voice/model_train.py --tflite
+  http         POST /predict on a running serve_fastapi.py
+
+Example:
+  python benchmark.py --ckpt ./models/recognition.pth --ts ./models/recognition.ts \
+      --onnx ./models/recognition.onnx --batch-sizes 1 8 --seq-lens 32 64 --threads 1 4 \
+      --out bench.json
+  python benchmark.py --http-url http://localhost:8000/predict --http-concurrency 1 8 --out http.json
+  python benchmark.py --compare bench_old.json bench.json
+"""
+import argparse, json, os, platform, statistics, time
+import numpy as np
+
+
+def percentile(samples, q):
+    s = sorted(samples)
+    if not s:
+        return 0.0
+    k = min(len(s) - 1, max(0, int(round(q / 100.0 * (len(s) - 1)))))
+    return s[k]
+
+
+def summarize(latencies_ms, batch_size):
+    mean = statistics.fmean(latencies_ms)
+    return {
+        "iters": len(latencies_ms),
+        "mean_ms": mean,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p90_ms": percentile(latencies_ms, 90),
+        "p99_ms": percentile(latencies_ms, 99),
+        "min_ms": min(latencies_ms),
+        "samples_per_s": (batch_size * 1000.0 / mean) if mean > 0 else 0.0,
+    }
+
+
+def time_fn(fn, warmup, iters):
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+# ---------- model backends ----------
+def make_eager_runner(rec):
+    import torch
+
+    def run(x):
+        if x.shape[0] == 1:
+            rec.predict(x[0])
+        else:
+            feats = np.stack([rec.prepare(s) for s in x])
+            with torch.no_grad():
+                rec.model(torch.from_numpy(feats).to(rec.device))
+    return run
+
+
+def make_torchscript_runner(path):
+    import torch
+    model = torch.jit.load(path, map_location="cpu").eval()
+
+    def run(x):
+        with torch.no_grad():
+            model(torch.from_numpy(x))
+    return run
+
+
+def make_onnx_runner(path, threads):
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = threads
+    opts.inter_op_num_threads = 1
+    sess = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+    input_name = sess.get_inputs()[0].name
+
+    def run(x):
+        sess.run(None, {input_name: x})
+    return run
+
+
+def bench_models(args):
+    import torch
+    from infer import Recognizer
+
+    rec = Recognizer(args.ckpt, device="cpu") if args.ckpt else None
+    input_dim = args.input_dim or (rec.model.input_linear.in_features if rec else None)
+    if input_dim is None and (args.ts or args.onnx):
+        raise SystemExit("--input-dim is required when --ckpt is not given")
+
+    results = []
+    rng = np.random.default_rng(0)
+    for threads in args.threads:
+        torch.set_num_threads(threads)
+        runners = {}
+        if rec is not None:
+            runners["eager"] = make_eager_runner(rec)
+        if args.ts:
+            runners["torchscript"] = make_torchscript_runner(args.ts)
+        if args.onnx:
+            runners["onnx"] = make_onnx_runner(args.onnx, threads)
+        if args.tflite:
+            runners["tflite"] = make_tflite_runner(args.tflite, threads)
+        for backend, run in runners.items():
+            if backend == "tflite":
+                dim = tflite_input_dim(args.tflite)
+            elif backend == "eager":
+                dim = rec.raw_input_dim  # Recognizer runs preprocess.py itself
+            else:
+                dim = input_dim  # exported models take preprocessed features
+            for seq_len in args.seq_lens:
+                if rec is not None:
+                    # Recognizer.predict resamples to its own seq_len; benchmark the requested length
+                    rec.seq_len = seq_len
+                for bs in args.batch_sizes:
+                    x = rng.standard_normal((bs, seq_len, dim)).astype(np.float32)
+                    try:
+                        lat = time_fn(lambda: run(x), args.warmup, args.iters)
+                    except Exception as e:
+                        print(f"[skip] {backend} threads={threads} seq_len={seq_len} batch={bs}: {e}")
+                        continue
+                    row = {"backend": backend, "threads": threads, "seq_len": seq_len, "batch_size": bs}
+                    row.update(summarize(lat, bs))
+                    results.append(row)
+                    print(f"{backend:12s} threads={threads:<3d} seq_len={seq_len:<4d} batch={bs:<4d} "
+                          f"p50={row['p50_ms']:.2f}ms p99={row['p99_ms']:.2f}ms {row['samples_per_s']:.1f}/s")
+    return results
+
+
+def make_tflite_runner(path, threads):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    interp = Interpreter(model_path=path, num_threads=threads)
+    inp = interp.get_input_details()[0]
+    state = {"shape": None}
+
+    def run(x):
+        if state["shape"] != x.shape:
+            interp.resize_tensor_input(inp["index"], list(x.shape))
+            interp.allocate_tensors()
+            state["shape"] = x.shape
+        interp.set_tensor(inp["index"], x)
+        interp.invoke()
+    return run
+
+
+def tflite_input_dim(path):
+    # the LSTM is trained on its own layout (see <model>.labels.json)
+    base = path[:-len(".tflite")] if path.endswith(".tflite") else path
+    with open(base + ".labels.json") as f:
+        return json.load(f)["keypoint_dim"]
+
+
+# ---------- HTTP backend ----------
+def bench_http(args):
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+
+    rng = np.random.default_rng(0)
+    results = []
+    for seq_len in args.seq_lens:
+        payload = {"keypoints": rng.standard_normal((seq_len, args.input_dim or 225)).astype(np.float32).tolist()}
+        body = json.dumps(payload)
+        for conc in args.http_concurrency:
+            session = requests.Session()
+            headers = {"Content-Type": "application/json"}
+
+            def one(_):
+                t0 = time.perf_counter()
+                r = session.post(args.http_url, data=body, headers=headers, timeout=30)
+                r.raise_for_status()
+                return (time.perf_counter() - t0) * 1000.0
+
+            for _ in range(args.warmup):
+                one(None)
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=conc) as pool:
+                lat = list(pool.map(one, range(args.http_requests)))
+            wall = time.perf_counter() - t0
+            row = {"backend": "http", "concurrency": conc, "seq_len": seq_len, "batch_size": 1}
+            row.update(summarize(lat, 1))
+            row["requests_per_s"] = len(lat) / wall if wall > 0 else 0.0
+            results.append(row)
+            print(f"http concurrency={conc:<3d} seq_len={seq_len:<4d} p50={row['p50_ms']:.2f}ms "
+                  f"p99={row['p99_ms']:.2f}ms {row['requests_per_s']:.1f} req/s")
+    return results
+
+
+# ---------- comparison ----------
+def _key(row):
+    return (row["backend"], row.get("threads"), row.get("concurrency"), row["seq_len"], row["batch_size"])
+
+
+def compare(old_path, new_path, metric="p50_ms"):
+    with open(old_path) as f:
+        old = {_key(r): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {_key(r): r for r in json.load(f)["results"]}
+    print(f"{'config':60s} {'old':>10s} {'new':>10s} {'change':>8s}")
+    for k in sorted(set(old) & set(new), key=str):
+        a, b = old[k][metric], new[k][metric]
+        change = (b - a) / a * 100.0 if a else 0.0
+        print(f"{str(k):60s} {a:10.2f} {b:10.2f} {change:+7.1f}%")
+
+
+def environment_info():
+    info = {"python": platform.python_version(), "machine": platform.machine(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count()}
+    try:
+        import torch
+        info["torch"] = torch.__version__
+    except ImportError:
+        pass
+    try:
+        import onnxruntime
+        info["onnxruntime"] = onnxruntime.__version__
+    except ImportError:
+        pass
+    return info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt", help="checkpoint for the eager backend")
+    parser.add_argument("--ts", help="TorchScript file from export_torchscript.py")
+    parser.add_argument("--onnx", help="ONNX file from export_onnx.py")
+    parser.add_argument("--tflite", help="TFLite file from sign_to_voice/model_train.py --tflite")
+    parser.add_argument("--input-dim", type=int, dest="input_dim")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16], dest="batch_sizes")
+    parser.add_argument("--seq-lens", type=int, nargs="+", default=[32, 64], dest="seq_lens")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument("--http-url", dest="http_url", help="e.g. http://localhost:8000/predict")
+    parser.add_argument("--http-concurrency", type=int, nargs="+", default=[1, 8], dest="http_concurrency")
+    parser.add_argument("--http-requests", type=int, default=200, dest="http_requests")
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--metric", default="p50_ms")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare[0], args.compare[1], metric=args.metric)
+        raise SystemExit(0)
+
+    results = []
+    if args.ckpt or args.ts or args.onnx or args.tflite:
+        results += bench_models(args)
+    if args.http_url:
+        results += bench_http(args)
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "env": environment_info(),
+              "config": vars(args), "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Saved benchmark results to", args.out)
@@ -0,0 +1,114 @@
+# server/checkpoint.py
+"""
+Weights-only checkpoint format: <base>.safetensors (tensors) + <base>.json (metadata:
+label_classes, input_dim, seq_len, preprocessing config, model hyperparams). Loading it never unpickles
+anything and the tensors are memory-mapped, so several worker processes on one box
+share the same physical pages.
+
+Convert an existing pickled checkpoint:
+  python checkpoint.py --ckpt ./models/recognition.pth
+"""
+import argparse, json, logging, os
+import torch
+
+logger = logging.getLogger("signbot.checkpoint")
+
+# hyperparams KPTransformer needs; everything else in train.py args is training-only
+MODEL_ARGS = ("d_model", "nhead", "num_layers", "ff_dim", "dropout", "early_exit")
+# full unpickling runs arbitrary code from the file; only allow it for checkpoints you trust
+ALLOW_UNSAFE_PICKLE = os.environ.get("SIGNBOT_ALLOW_UNSAFE_PICKLE", "0") == "1"
+
+
+def base_path(path):
+    root, ext = os.path.splitext(path)
+    return root if ext in (".pth", ".pt", ".safetensors", ".json") else path
+
+
+def build_metadata(label_classes, input_dim, seq_len, args, preprocess_cfg=None, raw_input_dim=None):
+    return {
+        "format": "kptransformer-safetensors-v1",
+        "label_classes": [str(c) for c in label_classes],
+        "input_dim": int(input_dim),
+        "raw_input_dim": int(raw_input_dim if raw_input_dim is not None else input_dim),
+        "seq_len": int(seq_len),
+        "preprocess": preprocess_cfg,
+        "args": {k: args[k] for k in MODEL_ARGS if k in args},
+    }
+
+
+def write_metadata(path, meta):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+
+def save_weights_only(state_dict, meta, path):
+    """
+    Writes <base>.json then <base>.safetensors (both atomically, metadata first so a
+    watcher that sees the weights can always find the sidecar). Returns the weights path.
+    """
+    from safetensors.torch import save_file
+    base = base_path(path)
+    write_metadata(base + ".json", meta)
+    tensors = {k: v.detach().cpu().contiguous() for k, v in state_dict.items()}
+    tmp = base + ".safetensors.tmp"
+    save_file(tensors, tmp, metadata={"format": meta.get("format", "")})
+    os.replace(tmp, base + ".safetensors")
+    return base + ".safetensors"
+
+
+def has_weights_only(path):
+    base = base_path(path)
+    return os.path.exists(base + ".safetensors") and os.path.exists(base + ".json")
+
+
+def load_weights_only(path):
+    """Returns (state_dict, meta); tensors are mmap-backed, no pickle involved."""
+    from safetensors.torch import load_file
+    base = base_path(path)
+    with open(base + ".json") as f:
+        meta = json.load(f)
+    return load_file(base + ".safetensors", device="cpu"), meta
+
+
+def load_pickled(path, allow_unsafe=None):
+    """
+    Legacy .pth dict from train.py, read with torch's weights_only unpickler. Old files that
+    hold non-primitive objects (e.g. numpy label_classes) only load with allow_unsafe=True or
+    SIGNBOT_ALLOW_UNSAFE_PICKLE=1; convert them once with this script instead.
+    """
+    try:
+        ck = torch.load(path, map_location="cpu", weights_only=True, mmap=True)
+    except Exception as e:
+        if not (ALLOW_UNSAFE_PICKLE if allow_unsafe is None else allow_unsafe):
+            raise RuntimeError(
+                "%s is not loadable with weights_only=True (%s); set SIGNBOT_ALLOW_UNSAFE_PICKLE=1 "
+                "or pass --allow-unsafe-pickle if you trust it" % (path, e)) from e
+        logger.warning("Full (unsafe) unpickle of %s: weights_only load failed: %s", path, e)
+        ck = torch.load(path, map_location="cpu", weights_only=False)
+    meta = build_metadata(ck["label_classes"], ck.get("input_dim"), ck.get("seq_len", 64), ck.get("args", {}),
+                          preprocess_cfg=ck.get("preprocess"), raw_input_dim=ck.get("raw_input_dim"))
+    return ck["model_state"], meta
+
+
+def load_checkpoint(path):
+    """Prefer the weights-only pair next to path when present (and not stale), else the pickled checkpoint."""
+    if path.endswith(".safetensors"):
+        return load_weights_only(path)
+    if has_weights_only(path) and os.path.getmtime(base_path(path) + ".safetensors") >= os.path.getmtime(path):
+        return load_weights_only(path)
+    return load_pickled(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt", required=True, help="pickled .pth checkpoint from train.py")
+    parser.add_argument("--out", help="output base path (default: next to --ckpt)")
+    parser.add_argument("--allow-unsafe-pickle", action="store_true",
+                        help="fully unpickle an old checkpoint that weights_only loading rejects (trusted files only)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    state, meta = load_pickled(args.ckpt, allow_unsafe=args.allow_unsafe_pickle or None)
+    out = save_weights_only(state, meta, args.out or args.ckpt)
+    print("Saved", out, "and", base_path(out) + ".json")
@@ -4,6 +4,7 @@ import numpy as np
 import torch
 from torch.utils.data import Dataset
 import random
+from preprocess import preprocess
 
 def horizontal_flip_keypoints(seq):
     # seq: (T, D) where D = (33+21+21)*3
@@ -18,14 +19,16 @@ class KeypointDataset(Dataset):
     """
     Expects manifest CSV with columns: file,label
     Each file is an .npz saved with keypoints: array shape (T,input_dim) and optional 'label'
-    During training sequences are resampled/padded to target_seq_len.
+    During training sequences are resampled/padded to target_seq_len, augmented on the raw
+    coordinates and then passed through preprocess.preprocess(preprocess_cfg).
     """
-    def __init__(self, manifest_csv, label_encoder, seq_len=64, augment=False):
+    def __init__(self, manifest_csv, label_encoder, seq_len=64, augment=False, preprocess_cfg=None):
         import pandas as pd
         self.df = pd.read_csv(manifest_csv)
         self.seq_len = seq_len
         self.augment = augment
         self.label_encoder = label_encoder  # sklearn LabelEncoder or dict mapping label->idx
+        self.preprocess_cfg = preprocess_cfg
 
     def __len__(self):
         return len(self.df)
@@ -52,6 +55,7 @@ class KeypointDataset(Dataset):
                 arr = horizontal_flip_keypoints(arr)
             # small noise
             arr += np.random.normal(0, 1e-3, arr.shape).astype(np.float32)
+        arr = preprocess(arr, self.preprocess_cfg)
         label = row['label']
         # label encoder might be dict or sklearn LabelEncoder-like object
         if isinstance(self.label_encoder, dict):
@@ -1,6 +1,7 @@
 # server/export_onnx.py
 import torch, argparse
 from infer import Recognizer
+from checkpoint import build_metadata, write_metadata
 
 def export_onnx(ckpt_path, out_path, seq_len=64):
     rec = Recognizer(ckpt_path)
@@ -11,6 +12,11 @@ def export_onnx(ckpt_path, out_path, seq_len=64):
                       output_names=['logits'],
                       dynamic_axes={'input': {0: 'batch', 1: 'time'}, 'logits': {0:'batch'}},
                       opset_version=12)
+    # sidecar so the export is self-describing (labels, input_dim, seq_len, preprocess config);
+    # exported models take preprocess.preprocess() features, not raw keypoints
+    write_metadata(out_path + ".json", build_metadata(rec.label_classes, model.input_linear.in_features,
+                                                      rec.seq_len, {}, preprocess_cfg=rec.preprocess_cfg,
+                                                      raw_input_dim=rec.raw_input_dim))
     print("Saved ONNX to", out_path)
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 # server/export_torchscript.py
 import torch, argparse, numpy as np
 from infer import Recognizer
+from checkpoint import build_metadata, write_metadata
 
 def export(ckpt_path, out_path, sample_seq_len=64, input_dim=None):
     rec = Recognizer(ckpt_path)
@@ -11,6 +12,11 @@ def export(ckpt_path, out_path, sample_seq_len=64, input_dim=None):
     dummy = torch.randn(1, sample_seq_len, input_dim)
     traced = torch.jit.trace(model, dummy)
     traced.save(out_path)
+    # sidecar so the export is self-describing (labels, input_dim, seq_len, preprocess config);
+    # exported models take preprocess.preprocess() features, not raw keypoints
+    write_metadata(out_path + ".json", build_metadata(rec.label_classes, model.input_linear.in_features,
+                                                      rec.seq_len, {}, preprocess_cfg=rec.preprocess_cfg,
+                                                      raw_input_dim=rec.raw_input_dim))
     print("Saved TorchScript to", out_path)
 
 if __name__ == "__main__":
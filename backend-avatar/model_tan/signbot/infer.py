@@ -1,27 +1,55 @@
 # server/infer.py
+import threading
 import torch
 import numpy as np
 from model import KPTransformer
+from checkpoint import load_checkpoint
+from preprocess import preprocess
 
 class Recognizer:
-    def __init__(self, ckpt_path, device=None):
+    def __init__(self, ckpt_path, device=None, early_exit_threshold=None):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        ck = torch.load(ckpt_path, map_location="cpu")
-        self.label_classes = ck['label_classes']
-        input_dim = ck.get('input_dim')
-        seq_len = ck.get('seq_len', 64)
-        args = ck.get('args', {})
-        # create model with saved hyperparams if present
-        self.model = KPTransformer(input_dim=input_dim, num_classes=len(self.label_classes),
-                                   d_model=args.get('d_model', 192),
-                                   nhead=args.get('nhead', 6),
-                                   num_layers=args.get('num_layers', 4),
-                                   ff_dim=args.get('ff_dim', 512),
-                                   dropout=args.get('dropout', 0.1))
-        self.model.load_state_dict(ck['model_state'])
+        # .safetensors + .json sidecar when available (mmap, no pickle), else the .pth dict
+        state, meta = load_checkpoint(ckpt_path)
+        self.label_classes = meta['label_classes']
+        input_dim = meta.get('input_dim')
+        seq_len = meta.get('seq_len', 64)
+        # features are computed exactly as in training (preprocess.py); None = raw keypoints
+        self.preprocess_cfg = meta.get('preprocess')
+        self.raw_input_dim = meta.get('raw_input_dim') or input_dim
+        args = meta.get('args', {})
+        # create model with saved hyperparams if present; on the meta device so no
+        # memory is spent on random init that load_state_dict would overwrite
+        with torch.device("meta"):
+            self.model = KPTransformer(input_dim=input_dim, num_classes=len(self.label_classes),
+                                       d_model=args.get('d_model', 192),
+                                       nhead=args.get('nhead', 6),
+                                       num_layers=args.get('num_layers', 4),
+                                       ff_dim=args.get('ff_dim', 512),
+                                       dropout=args.get('dropout', 0.1),
+                                       early_exit=args.get('early_exit', False))
+        # assign=True keeps the (mmap-backed) tensors instead of copying into fresh params
+        self.model.load_state_dict(state, assign=True)
         self.model.to(self.device)
         self.model.eval()
         self.seq_len = seq_len
+        # early exit is only possible when the checkpoint was trained with --early-exit
+        if self.model.exit_heads is None:
+            early_exit_threshold = None
+        self.early_exit_threshold = early_exit_threshold
+        self.exit_counts = [0] * len(self.model.transformer.layers)
+        # predict() runs concurrently (asyncio.to_thread workers)
+        self._exit_lock = threading.Lock()
+
+    def __getstate__(self):
+        # the pool sends the Recognizer to worker processes; locks do not pickle
+        state = self.__dict__.copy()
+        del state['_exit_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._exit_lock = threading.Lock()
 
     def _resample(self, arr):
         # arr: (T, D)
@@ -33,19 +61,62 @@ class Recognizer:
         idx = np.linspace(0, T-1, self.seq_len).astype(int)
         return arr[idx]
 
+    def prepare(self, keypoints_sequence):
+        """Raw (T, raw_input_dim) keypoints -> model features (seq_len, input_dim)."""
+        arr = np.asarray(keypoints_sequence, dtype=np.float32)
+        return preprocess(self._resample(arr), self.preprocess_cfg)
+
+    def _logits(self, keypoints_sequence):
+        arr = self.prepare(keypoints_sequence)
+        x = torch.from_numpy(arr).unsqueeze(0).to(self.device)  # (1, T, D)
+        with torch.no_grad():
+            if self.early_exit_threshold is not None:
+                logits, exit_layer = self.model.forward_early_exit(x, self.early_exit_threshold)
+            else:
+                logits, exit_layer = self.model(x), len(self.exit_counts) - 1
+        with self._exit_lock:
+            self.exit_counts[exit_layer] += 1
+        return logits
+
     def predict(self, keypoints_sequence):
         """
         keypoints_sequence: np.array shape (T, D) or list
         returns: (label, confidence, probs)
         """
-        arr = np.asarray(keypoints_sequence, dtype=np.float32)
-        arr = self._resample(arr)
-        x = torch.from_numpy(arr).unsqueeze(0).to(self.device)  # (1, T, D)
-        with torch.no_grad():
-            logits = self.model(x)
-            probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
-            idx = int(probs.argmax())
-            return self.label_classes[idx], float(probs[idx]), probs
+        logits = self._logits(keypoints_sequence)
+        probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
+        idx = int(probs.argmax())
+        return self.label_classes[idx], float(probs[idx]), probs
+
+    def predict_topk(self, keypoints_sequence, k=5):
+        """
+        Like predict but only materializes the k best classes.
+        returns: list of (label, prob) sorted by prob desc
+        """
+        logits = self._logits(keypoints_sequence)[0]
+        k = min(k, logits.numel())
+        top = torch.topk(logits, k)
+        # log-softmax of the top-k entries only needs the logsumexp over all logits
+        probs = torch.exp(top.values - torch.logsumexp(logits, dim=0)).cpu().numpy()
+        return [(self.label_classes[int(i)], float(p)) for i, p in zip(top.indices.cpu().numpy(), probs)]
+
+    def reset_exit_stats(self):
+        with self._exit_lock:
+            self.exit_counts = [0] * len(self.exit_counts)
+
+    def exit_stats(self):
+        """
+        Per-layer exit counts and rates since startup (last entry = full model).
+        """
+        with self._exit_lock:
+            counts = list(self.exit_counts)
+        total = sum(counts)
+        return {
+            "total": total,
+            "early_exit_threshold": self.early_exit_threshold,
+            "layers": [{"layer": i, "count": c, "rate": (c / total) if total else 0.0}
+                       for i, c in enumerate(counts)],
+        }
 
 # quick test
 if __name__ == "__main__":
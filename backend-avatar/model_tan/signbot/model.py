@@ -24,8 +24,13 @@ class KPTransformer(nn.Module):
     Keypoint-based Transformer classifier.
     Input: (B, T, input_dim)
     Output: (B, num_classes) logits
+
+    With early_exit=True a small LayerNorm+Linear head is attached after every
+    encoder layer except the last, so inference can stop as soon as one of them
+    is confident enough (see forward_early_exit).
     """
-    def __init__(self, input_dim, num_classes, d_model=192, nhead=6, num_layers=4, ff_dim=512, dropout=0.1):
+    def __init__(self, input_dim, num_classes, d_model=192, nhead=6, num_layers=4, ff_dim=512, dropout=0.1,
+                 early_exit=False):
         super().__init__()
         self.input_linear = nn.Linear(input_dim, d_model)
         self.pos_enc = PositionalEncoding(d_model, dropout=dropout, max_len=1024)
@@ -36,6 +41,16 @@ class KPTransformer(nn.Module):
             nn.LayerNorm(d_model),
             nn.Linear(d_model, num_classes)
         )
+        self.exit_heads = None
+        if early_exit:
+            self.exit_heads = nn.ModuleList([
+                nn.Sequential(nn.LayerNorm(d_model), nn.Linear(d_model, num_classes))
+                for _ in range(num_layers - 1)
+            ])
+
+    def _pooled(self, x):
+        # (B, T, d_model) -> (B, d_model)
+        return self.pool(x.transpose(1, 2)).squeeze(-1)
 
     def forward(self, x):
         # x: (B, T, input_dim)
@@ -46,3 +61,39 @@ class KPTransformer(nn.Module):
         x = self.pool(x).squeeze(-1)  # (B, d_model)
         logits = self.classifier(x)   # (B, num_classes)
         return logits
+
+    def forward_all_exits(self, x):
+        """
+        Training helper: returns a list with the logits of every exit head
+        followed by the final classifier logits (last element).
+        """
+        x = self.pos_enc(self.input_linear(x))
+        outputs = []
+        layers = self.transformer.layers
+        for i, layer in enumerate(layers):
+            x = layer(x)
+            if self.exit_heads is not None and i < len(layers) - 1:
+                outputs.append(self.exit_heads[i](self._pooled(x)))
+        if self.transformer.norm is not None:
+            x = self.transformer.norm(x)
+        outputs.append(self.classifier(self._pooled(x)))
+        return outputs
+
+    def forward_early_exit(self, x, threshold=0.9):
+        """
+        Runs encoder layers one at a time and returns (logits, exit_layer) as soon
+        as every sample in the batch has max softmax prob >= threshold at an exit
+        head. exit_layer is 0-based; num_layers - 1 means the full model ran.
+        """
+        x = self.pos_enc(self.input_linear(x))
+        layers = self.transformer.layers
+        for i, layer in enumerate(layers):
+            x = layer(x)
+            if self.exit_heads is not None and i < len(layers) - 1:
+                logits = self.exit_heads[i](self._pooled(x))
+                conf = torch.softmax(logits, dim=1).max(dim=1).values
+                if bool((conf >= threshold).all()):
+                    return logits, i
+        if self.transformer.norm is not None:
+            x = self.transformer.norm(x)
+        return self.classifier(self._pooled(x)), len(layers) - 1
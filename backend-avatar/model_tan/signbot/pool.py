@@ -0,0 +1,188 @@
+# server/pool.py
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from infer import Recognizer
+
+logger = logging.getLogger("signbot.pool")
+
+
+class PoolBusy(Exception):
+    """Raised when the request queue is full (caller should answer 503)."""
+
+
+def _worker_main(worker_id, recognizer, threads, requests_q, results_q, current):
+    torch.set_num_threads(threads)
+    # weights live in shared memory; only activations are per-process
+    while True:
+        item = requests_q.get()
+        if item is None:
+            break
+        req_id, arr, top_k = item
+        # shared slot (written synchronously) so the parent can fail this request if we die
+        current.value = req_id
+        try:
+            if top_k:
+                top = recognizer.predict_topk(arr, k=top_k)
+                results_q.put((req_id, True, (top[0][0], top[0][1], top)))
+            else:
+                label, conf, _ = recognizer.predict(arr)
+                results_q.put((req_id, True, (label, conf, None)))
+        except Exception as e:
+            results_q.put((req_id, False, repr(e)))
+        current.value = -1
+
+
+class InferencePool:
+    """
+    Pool of inference processes sharing one copy of the KPTransformer weights.
+
+    The parent loads the Recognizer once and moves its tensors to shared memory;
+    workers receive it through torch.multiprocessing so no process holds a private
+    copy of the weights. Requests go through one bounded queue: when it is full,
+    submit() raises PoolBusy instead of letting latency grow without bound.
+    """
+    def __init__(self, ckpt_path, num_workers=None, max_queue=64, threads_per_worker=1, recognizer_kwargs=None):
+        self.ckpt_path = ckpt_path
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 1) // max(1, threads_per_worker))
+        self.max_queue = max_queue
+        self.threads_per_worker = threads_per_worker
+        self.recognizer_kwargs = recognizer_kwargs or {}
+        self._ctx = mp.get_context("spawn")
+        self._requests = self._ctx.Queue(maxsize=max_queue)
+        self._results = self._ctx.Queue()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._current = []  # per worker: shared id of the request it is processing (-1 = idle)
+        self._dead = set()
+        self._stopping = False
+        self._ids = itertools.count()
+        self._workers = []
+        self._collector = None
+        self.rejected = 0
+
+    def start(self):
+        rec = Recognizer(self.ckpt_path, device="cpu", **self.recognizer_kwargs)
+        rec.model.share_memory()
+        for i in range(self.num_workers):
+            current = self._ctx.Value("q", -1, lock=False)
+            p = self._ctx.Process(target=_worker_main, name=f"signbot-worker-{i}",
+                                  args=(i, rec, self.threads_per_worker, self._requests, self._results, current),
+                                  daemon=True)
+            self._current.append(current)
+            p.start()
+            self._workers.append(p)
+        self._collector = threading.Thread(target=self._collect, name="signbot-pool-results", daemon=True)
+        self._collector.start()
+        self.seq_len = rec.seq_len
+        self.input_dim = rec.raw_input_dim
+        logger.info("Started %d inference workers for %s", self.num_workers, self.ckpt_path)
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                item = self._results.get(timeout=1.0)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if not self._stopping and time.monotonic() - last_check >= 1.0:
+                self._fail_dead_workers()
+                last_check = time.monotonic()
+            if not item:
+                continue
+            req_id, ok, payload = item
+            with self._pending_lock:
+                fut = self._pending.pop(req_id, None)
+            if fut is None:
+                continue
+            if ok:
+                self._resolve(fut, result=payload)
+            else:
+                self._resolve(fut, error=RuntimeError(payload))
+
+    @staticmethod
+    def _resolve(fut, result=None, error=None):
+        # the caller may have timed out / disconnected and cancelled the future
+        if fut.done():
+            return
+        try:
+            if error is None:
+                fut.set_result(result)
+            else:
+                fut.set_exception(error)
+        except InvalidStateError:
+            pass
+
+    def _fail_dead_workers(self):
+        """Fail the requests held by workers that died (and everything, if none is left)."""
+        newly_dead = {i for i, p in enumerate(self._workers) if not p.is_alive() and i not in self._dead}
+        if not newly_dead:
+            return
+        self._dead |= newly_dead
+        all_dead = len(self._dead) == len(self._workers)
+        with self._pending_lock:
+            if all_dead:
+                held = list(self._pending)
+            else:
+                held = [self._current[i].value for i in newly_dead]
+            failed = [self._pending.pop(r) for r in held if r in self._pending]
+        for i in sorted(newly_dead):
+            logger.error("Inference worker %d exited with code %s", i, self._workers[i].exitcode)
+        for fut in failed:
+            self._resolve(fut, error=RuntimeError("inference worker died"))
+
+    def submit(self, keypoints, top_k=0):
+        """Queue one sequence; returns a concurrent.futures.Future resolving to
+        (label, confidence, top-k [(label, prob)] or None)."""
+        if self._workers and len(self._dead) == len(self._workers):
+            raise RuntimeError("all inference workers have died")
+        arr = np.asarray(keypoints, dtype=np.float32)
+        req_id = next(self._ids)
+        fut = Future()
+        with self._pending_lock:
+            self._pending[req_id] = fut
+        try:
+            self._requests.put_nowait((req_id, arr, top_k))
+        except queue.Full:
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+            self.rejected += 1
+            raise PoolBusy("inference queue full (%d)" % self.max_queue)
+        return fut
+
+    def status(self):
+        try:
+            depth = self._requests.qsize()
+        except NotImplementedError:  # macOS
+            depth = None
+        return {
+            "ckpt": self.ckpt_path,
+            "workers": self.num_workers,
+            "alive": sum(p.is_alive() for p in self._workers),
+            "threads_per_worker": self.threads_per_worker,
+            "queue_depth": depth,
+            "max_queue": self.max_queue,
+            "in_flight": len(self._pending),
+            "rejected": self.rejected,
+        }
+
+    def stop(self, timeout=5.0):
+        self._stopping = True
+        for _ in self._workers:
+            self._requests.put(None)
+        for p in self._workers:
+            p.join(timeout=timeout)
+            if p.is_alive():
+                p.terminate()
+        self._results.put(None)
+        self._workers = []
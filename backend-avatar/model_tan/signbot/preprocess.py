@@ -0,0 +1,104 @@
+# server/preprocess.py
+"""
+Keypoint preprocessing shared by signbot (KPTransformer) and sign_to_voice (LSTM).
+
+The config is a plain dict stored with the checkpoint (ckpt['preprocess'] and the
+.json sidecar) so Recognizer applies exactly what the model was trained with.
+A config of None means raw MediaPipe coordinates (old checkpoints).
+
+  cfg = make_config(225, normalize=True, velocity=True, drop=["lower_body"])
+  feats = preprocess(seq, cfg)          # (T, 225) -> (T, output_dim(cfg))
+"""
+import numpy as np
+
+# layout name -> number of (x, y, z) landmarks per frame
+LAYOUTS = {
+    "holistic": 33 + 21 + 21,  # pose, left hand, right hand (signbot)
+    "hand": 21,                # single hand (sign_to_voice)
+}
+
+# MediaPipe pose indices
+L_SHOULDER, R_SHOULDER = 11, 12
+WRIST, MIDDLE_MCP = 0, 9
+
+# named groups of landmarks that carry little signal for signing
+DROP_GROUPS = {
+    "holistic": {
+        "lower_body": list(range(23, 33)),  # hips, knees, ankles, heels, toes
+        "face": list(range(1, 11)),         # eyes, ears, mouth (nose 0 kept)
+    },
+    "hand": {},
+}
+
+
+def layout_for_dim(input_dim):
+    for name, n in LAYOUTS.items():
+        if n * 3 == input_dim:
+            return name
+    raise ValueError("No keypoint layout with %d features per frame" % input_dim)
+
+
+def make_config(input_dim, normalize=True, velocity=False, drop=()):
+    """Returns None when nothing is enabled, so the checkpoint stays on raw features."""
+    if not (normalize or velocity or drop):
+        return None
+    layout = layout_for_dim(input_dim)
+    keep = set(range(LAYOUTS[layout]))
+    for group in drop:
+        if group not in DROP_GROUPS[layout]:
+            raise ValueError("Unknown drop group %r for layout %r" % (group, layout))
+        keep -= set(DROP_GROUPS[layout][group])
+    return {
+        "layout": layout,
+        "normalize": bool(normalize),
+        "velocity": bool(velocity),
+        "drop": list(drop),
+        "keep": sorted(keep),
+    }
+
+
+def output_dim(cfg, input_dim):
+    if cfg is None:
+        return input_dim
+    d = len(cfg["keep"]) * 3
+    return d * 2 if cfg["velocity"] else d
+
+
+def _origin_and_scale(pts, layout):
+    # pts: (T, L, 3) -> origin (T, 1, 3), scale (T, 1, 1)
+    if layout == "holistic":
+        a, b = pts[:, L_SHOULDER], pts[:, R_SHOULDER]
+        origin = (a + b) / 2.0
+        scale = np.linalg.norm((a - b)[:, :2], axis=1)
+    else:
+        origin = pts[:, WRIST]
+        scale = np.linalg.norm((pts[:, MIDDLE_MCP] - pts[:, WRIST])[:, :2], axis=1)
+    # frames where the reference points are missing (MediaPipe zeros) fall back to the
+    # median scale of the sequence, or 1 if nothing was detected at all
+    valid = scale > 1e-6
+    fallback = float(np.median(scale[valid])) if valid.any() else 1.0
+    scale = np.where(valid, scale, fallback)
+    return origin[:, None, :], scale[:, None, None]
+
+
+def preprocess(seq, cfg):
+    """
+    seq: (T, D) raw keypoints, already resampled to seq_len.
+    returns: (T, output_dim(cfg, D)) float32
+    """
+    seq = np.asarray(seq, dtype=np.float32)
+    if cfg is None:
+        return seq
+    T = seq.shape[0]
+    pts = seq.reshape(T, -1, 3)
+    missing = np.all(pts == 0.0, axis=2, keepdims=True)
+    if cfg["normalize"]:
+        origin, scale = _origin_and_scale(pts, cfg["layout"])
+        pts = np.where(missing, 0.0, (pts - origin) / scale)
+    pts = pts[:, cfg["keep"]]
+    feats = pts.reshape(T, -1)
+    if cfg["velocity"]:
+        vel = np.zeros_like(feats)
+        vel[1:] = feats[1:] - feats[:-1]
+        feats = np.concatenate([feats, vel], axis=1)
+    return feats.astype(np.float32)
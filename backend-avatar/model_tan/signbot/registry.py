@@ -0,0 +1,172 @@
+# server/registry.py
+import glob
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from infer import Recognizer
+
+logger = logging.getLogger("signbot.registry")
+
+CHECKPOINT_PATTERNS = ("*.pth", "*.safetensors")
+
+
+class _Slot:
+    """A loaded model plus the number of requests currently using it."""
+    def __init__(self, path, mtime, recognizer):
+        self.path = path
+        self.mtime = mtime
+        self.recognizer = recognizer
+        self.in_flight = 0
+        self.drained = threading.Event()
+        self.drained.set()
+
+
+class ModelRegistry:
+    """
+    Watches a directory for new checkpoints, loads + warms them in a background
+    thread and atomically swaps them in. The previous model stays alive until
+    every request that acquired it has finished.
+
+    Usage:
+        registry = ModelRegistry("./models")
+        registry.start()
+        with registry.acquire() as rec:
+            rec.predict(arr)
+    """
+    def __init__(self, model_dir, poll_interval=5.0, recognizer_kwargs=None, warmup_iters=3):
+        self.model_dir = model_dir
+        self.poll_interval = poll_interval
+        self.recognizer_kwargs = recognizer_kwargs or {}
+        self.warmup_iters = warmup_iters
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._current = None
+        self._retired = []
+        self._failed = {}  # path -> mtime of a checkpoint that failed to load
+        self._stop = threading.Event()
+        self._thread = None
+        self.history = []
+
+    # ---------- discovery ----------
+    def latest_checkpoint(self):
+        paths = []
+        for pattern in CHECKPOINT_PATTERNS:
+            paths.extend(glob.glob(os.path.join(self.model_dir, pattern)))
+        if not paths:
+            return None, None
+        path = max(paths, key=os.path.getmtime)
+        return path, os.path.getmtime(path)
+
+    # ---------- loading ----------
+    def _load(self, path):
+        rec = Recognizer(path, **self.recognizer_kwargs)
+        # warm up allocator / kernels before taking traffic
+        dummy = np.zeros((rec.seq_len, rec.raw_input_dim), dtype=np.float32)
+        for _ in range(self.warmup_iters):
+            rec.predict(dummy)
+        rec.reset_exit_stats()
+        return rec
+
+    def load_latest(self):
+        """Load the newest checkpoint if it differs from the serving one. Returns True on swap."""
+        with self._load_lock:
+            return self._load_latest_locked()
+
+    def _load_latest_locked(self):
+        path, mtime = self.latest_checkpoint()
+        if path is None:
+            return False
+        current = self._current
+        if current is not None and current.path == path and current.mtime == mtime:
+            return False
+        if self._failed.get(path) == mtime:
+            return False  # already failed; retried once the file changes
+        # skip files that are still being written (size still changing)
+        size = os.path.getsize(path)
+        time.sleep(0.2)
+        if os.path.getsize(path) != size:
+            return False
+        t0 = time.perf_counter()
+        try:
+            rec = self._load(path)
+        except Exception:
+            logger.exception("Failed to load checkpoint %s; keeping current model", path)
+            self._failed[path] = mtime
+            return False
+        self._failed.pop(path, None)
+        self._swap(_Slot(path, mtime, rec))
+        load_s = time.perf_counter() - t0
+        self.history.append({"path": path, "mtime": mtime, "load_s": load_s, "swapped_at": time.time()})
+        logger.info("Serving %s (loaded + warmed in %.2fs)", path, load_s)
+        return True
+
+    def _swap(self, slot):
+        with self._lock:
+            old = self._current
+            self._current = slot
+            if old is not None:
+                self._retired.append(old)
+            self._reap_locked()
+
+    def _reap_locked(self):
+        # drop retired models once their in-flight requests have drained
+        self._retired = [s for s in self._retired if s.in_flight > 0]
+
+    # ---------- serving ----------
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            slot = self._current
+            if slot is None:
+                raise RuntimeError("No model loaded yet from %s" % self.model_dir)
+            slot.in_flight += 1
+            slot.drained.clear()
+        try:
+            yield slot.recognizer
+        finally:
+            with self._lock:
+                slot.in_flight -= 1
+                if slot.in_flight == 0:
+                    slot.drained.set()
+                    self._reap_locked()
+
+    @property
+    def current(self):
+        slot = self._current
+        return slot.recognizer if slot is not None else None
+
+    def status(self):
+        with self._lock:
+            cur = self._current
+            return {
+                "model_dir": self.model_dir,
+                "current": None if cur is None else {"path": cur.path, "mtime": cur.mtime, "in_flight": cur.in_flight},
+                "draining": [{"path": s.path, "in_flight": s.in_flight} for s in self._retired],
+                "history": list(self.history[-10:]),
+                "failed": [{"path": p, "mtime": m} for p, m in self._failed.items()],
+            }
+
+    # ---------- watcher ----------
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.load_latest()
+            except Exception:
+                logger.exception("Model watcher iteration failed")
+
+    def start(self):
+        """Load the current checkpoint synchronously, then watch for new ones in the background."""
+        self.load_latest()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
@@ -1,27 +1,119 @@
 # server/serve_fastapi.py
+import asyncio
+import os
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uvicorn
 import numpy as np
-from infer import Recognizer
+from registry import ModelRegistry
+from pool import InferencePool, PoolBusy
 
 app = FastAPI()
 
-# load model once at startup
-MODEL_CKPT = "./models/recognition.pth"
-recognizer = Recognizer(MODEL_CKPT)
+# the newest checkpoint in MODEL_DIR is served; new ones dropped there are hot-swapped
+MODEL_DIR = os.environ.get("SIGNBOT_MODEL_DIR", "./models")
+MODEL_POLL_SECONDS = float(os.environ.get("SIGNBOT_MODEL_POLL_SECONDS", "5"))
+# confidence needed to stop at an intermediate layer; None disables early exit
+EARLY_EXIT_THRESHOLD = 0.9
+registry = ModelRegistry(MODEL_DIR, poll_interval=MODEL_POLL_SECONDS,
+                         recognizer_kwargs={"early_exit_threshold": EARLY_EXIT_THRESHOLD})
+
+# SIGNBOT_POOL_WORKERS > 0 switches to multi-process serving: one HTTP process feeds
+# N inference processes that share a single copy of the weights (see pool.py)
+POOL_WORKERS = int(os.environ.get("SIGNBOT_POOL_WORKERS", "0"))
+POOL_THREADS_PER_WORKER = int(os.environ.get("SIGNBOT_POOL_THREADS_PER_WORKER", "1"))
+POOL_MAX_QUEUE = int(os.environ.get("SIGNBOT_POOL_MAX_QUEUE", "64"))
+POOL_TIMEOUT_SECONDS = float(os.environ.get("SIGNBOT_POOL_TIMEOUT_SECONDS", "10"))
+pool = None
 
 class PredictRequest(BaseModel):
     keypoints: list  # list of frames; each frame is flat list of floats length input_dim
+    top_k: int = Field(default=0, ge=0, le=20)  # > 0 adds the k best [label, prob] pairs
+
+@app.on_event("startup")
+def load_models():
+    global pool
+    if POOL_WORKERS > 0:
+        # pool mode serves the checkpoint present at startup (no hot-reload)
+        path, _ = registry.latest_checkpoint()
+        if path is None:
+            raise RuntimeError("No checkpoint found in %s" % MODEL_DIR)
+        pool = InferencePool(path, num_workers=POOL_WORKERS, max_queue=POOL_MAX_QUEUE,
+                             threads_per_worker=POOL_THREADS_PER_WORKER,
+                             recognizer_kwargs={"early_exit_threshold": EARLY_EXIT_THRESHOLD})
+        pool.start()
+    else:
+        registry.start()
+
+@app.on_event("shutdown")
+def stop_watcher():
+    if pool is not None:
+        pool.stop()
+    registry.stop()
+
+async def _predict_pool(arr, top_k=0):
+    try:
+        fut = pool.submit(arr, top_k=top_k)
+    except PoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(fut), timeout=POOL_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="inference timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict")
-def predict(req: PredictRequest):
+async def predict(req: PredictRequest):
+    if pool is not None:
+        label, conf, top = await _predict_pool(req.keypoints, req.top_k)
+        return _prediction(label, conf, top)
     try:
         arr = np.array(req.keypoints, dtype=np.float32)
-        label, conf, probs = recognizer.predict(arr)
-        return {"label": label, "confidence": conf}
+        # in-process model: keep the blocking forward off the event loop
+        label, conf, top = await asyncio.to_thread(_predict_local, arr, req.top_k)
+        return _prediction(label, conf, top)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _prediction(label, conf, top):
+    result = {"label": label, "confidence": conf}
+    if top is not None:
+        result["top_k"] = [{"label": l, "confidence": p} for l, p in top]
+    return result
+
+def _predict_local(arr, top_k=0):
+    with registry.acquire() as recognizer:
+        if top_k:
+            # only the k best classes are materialized
+            top = recognizer.predict_topk(arr, k=top_k)
+            return top[0][0], top[0][1], top
+        label, conf, probs = recognizer.predict(arr)
+    return label, conf, None
+
+@app.get("/pool")
+def pool_status():
+    if pool is None:
+        raise HTTPException(status_code=404, detail="pool mode disabled (SIGNBOT_POOL_WORKERS=0)")
+    return pool.status()
+
+@app.get("/stats/exits")
+def exit_stats():
+    if pool is not None:
+        raise HTTPException(status_code=404, detail="exit stats are per-process; not available in pool mode")
+    with registry.acquire() as recognizer:
+        return recognizer.exit_stats()
+
+@app.get("/models")
+def models():
+    return registry.status()
+
+@app.post("/models/reload")
+def reload_models():
+    if pool is not None:
+        raise HTTPException(status_code=409, detail="hot-reload is not available in pool mode")
+    return {"swapped": registry.load_latest(), **registry.status()}
+
 if __name__ == "__main__":
+    # keep a single HTTP worker: extra cores are used by the inference pool instead
     uvicorn.run("serve_fastapi:app", host="0.0.0.0", port=8000, workers=1)
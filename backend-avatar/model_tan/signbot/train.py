@@ -8,6 +8,8 @@ import pandas as pd
 import numpy as np
 from model import KPTransformer
 from dataset import KeypointDataset
+from preprocess import make_config, output_dim
+from checkpoint import build_metadata, save_weights_only
 
 def build_label_encoder(manifest_csv):
     df = pd.read_csv(manifest_csv)
@@ -28,20 +30,25 @@ def train_loop(args):
     le = LabelEncoder(); le.fit(train_df['label'])
     label_map = {lab: int(i) for i, lab in enumerate(le.classes_)}
 
-    train_ds = KeypointDataset(args.train_csv, label_map, seq_len=args.seq_len, augment=True)
-    val_ds = KeypointDataset(args.val_csv, label_map, seq_len=args.seq_len, augment=False)
+    sample = np.load(train_df.iloc[0]['file'])['keypoints']
+    raw_input_dim = sample.shape[1]
+    preprocess_cfg = make_config(raw_input_dim, normalize=args.normalize, velocity=args.velocity, drop=args.drop)
+    input_dim = output_dim(preprocess_cfg, raw_input_dim)
+
+    train_ds = KeypointDataset(args.train_csv, label_map, seq_len=args.seq_len, augment=True,
+                               preprocess_cfg=preprocess_cfg)
+    val_ds = KeypointDataset(args.val_csv, label_map, seq_len=args.seq_len, augment=False,
+                             preprocess_cfg=preprocess_cfg)
 
     train_loader = DataLoader(train_ds, batch_size=args.batch_size, shuffle=True, collate_fn=collate_fn)
     val_loader = DataLoader(val_ds, batch_size=args.batch_size*2, shuffle=False, collate_fn=collate_fn)
 
-    sample = np.load(train_df.iloc[0]['file'])['keypoints']
-    input_dim = sample.shape[1]
     num_classes = len(le.classes_)
 
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model = KPTransformer(input_dim=input_dim, num_classes=num_classes,
                           d_model=args.d_model, nhead=args.nhead, num_layers=args.num_layers,
-                          ff_dim=args.ff_dim, dropout=args.dropout)
+                          ff_dim=args.ff_dim, dropout=args.dropout, early_exit=args.early_exit)
     model.to(device)
     opt = torch.optim.Adam(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
     best_val = 0.0
@@ -51,8 +58,17 @@ def train_loop(args):
         total_loss = 0.0; total=0; correct=0
         for X,y in train_loader:
             X = X.to(device); y = y.to(device)
-            logits = model(X)
-            loss = F.cross_entropy(logits, y)
+            if args.early_exit:
+                # final head + averaged intermediate exit heads (deep supervision)
+                outs = model.forward_all_exits(X)
+                logits = outs[-1]
+                loss = F.cross_entropy(logits, y)
+                if len(outs) > 1:
+                    exit_loss = sum(F.cross_entropy(o, y) for o in outs[:-1]) / (len(outs) - 1)
+                    loss = loss + args.exit_loss_weight * exit_loss
+            else:
+                logits = model(X)
+                loss = F.cross_entropy(logits, y)
             opt.zero_grad(); loss.backward(); opt.step()
             total_loss += float(loss.item()) * X.size(0)
             preds = logits.argmax(1)
@@ -64,27 +80,49 @@ def train_loop(args):
         # validation
         model.eval()
         total=0; correct=0
+        exit_correct = None
         with torch.no_grad():
             for X,y in val_loader:
                 X = X.to(device); y = y.to(device)
-                logits = model(X)
+                if args.early_exit:
+                    outs = model.forward_all_exits(X)
+                    logits = outs[-1]
+                    if exit_correct is None:
+                        exit_correct = [0] * (len(outs) - 1)
+                    for i, o in enumerate(outs[:-1]):
+                        exit_correct[i] += (o.argmax(1)==y).sum().item()
+                else:
+                    logits = model(X)
                 preds = logits.argmax(1)
                 total += X.size(0)
                 correct += (preds==y).sum().item()
         val_acc = correct/total
         print(f"Epoch {epoch} train_loss={train_loss:.4f} train_acc={train_acc:.4f} val_acc={val_acc:.4f}")
+        if exit_correct:
+            print("  exit head val_acc: " + " ".join(f"L{i}={c/total:.4f}" for i, c in enumerate(exit_correct)))
 
         # save best
         if val_acc > best_val:
             best_val = val_acc
             ckpt = {
                 "model_state": model.state_dict(),
-                "label_classes": list(le.classes_),
+                # plain str, not numpy.str_, so torch.load(weights_only=True) can read it back
+                "label_classes": [str(c) for c in le.classes_],
                 "input_dim": input_dim,
                 "seq_len": args.seq_len,
+                "raw_input_dim": raw_input_dim,
+                "preprocess": preprocess_cfg,
                 "args": vars(args)
             }
-            torch.save(ckpt, args.out)
+            # write-then-rename so a serving ModelRegistry never sees a partial file
+            tmp_path = args.out + ".tmp"
+            torch.save(ckpt, tmp_path)
+            os.replace(tmp_path, args.out)
+            # weights-only copy for fast, pickle-free loading in Recognizer
+            save_weights_only(model.state_dict(),
+                              build_metadata(le.classes_, input_dim, args.seq_len, vars(args),
+                                             preprocess_cfg=preprocess_cfg, raw_input_dim=raw_input_dim),
+                              args.out)
             print("Saved best checkpoint to", args.out)
 
     # also write label file separate
@@ -105,6 +143,13 @@ if __name__ == "__main__":
     parser.add_argument("--dropout", type=float, default=0.1)
     parser.add_argument("--lr", type=float, default=1e-3)
     parser.add_argument("--weight-decay", type=float, default=1e-5)
+    parser.add_argument("--normalize", action="store_true",
+                        help="center/scale keypoints on the shoulders (wrist for single-hand data)")
+    parser.add_argument("--velocity", action="store_true", help="append frame-to-frame velocity features")
+    parser.add_argument("--drop", nargs="*", default=[], help="landmark groups to drop, e.g. lower_body face")
+    parser.add_argument("--early-exit", action="store_true", dest="early_exit",
+                        help="attach classifier heads to intermediate layers for early-exit inference")
+    parser.add_argument("--exit-loss-weight", type=float, default=0.5, dest="exit_loss_weight")
     parser.add_argument("--out", default="./models/recognition.pth")
     args = parser.parse_args()
     train_loop(args)
@@ -1,19 +1,7 @@
 
 
 
-import yt_dlp
 import os
-import re
-import cloudinary
-import cloudinary.uploader
-
-
-# === CONFIGURE CLOUDINARY ===
-cloudinary.config(
-    cloud_name="dhq1sh1p2",
-    api_key="865476541255872",
-    api_secret="2nikW2gAWtygWRoPwT9uYaK6gIM"
-)
 
 
 # # === SINGLE VIDEO URL ===
@@ -70,52 +58,17 @@ cloudinary.config(
 # except Exception as e:
 #     print("❌ Upload failed:", e)
 
-import cloudinary
-import cloudinary.api
+# === SYNC CATALOGUE AND EXPORT ===
+# Credentials come from CLOUDINARY_* in the environment (.env), never from source.
+# Incremental sync into the indexed catalogue (see modelsrc_abhi/modelsrc/music_catalogue.py),
+# then write the legacy list the app bundles. The API also serves it paginated at /music/tracks.
 import json
+import sys
 
-def get_all_mindfm_files():
-    resources = []
-    next_cursor = None
-
-    while True:
-        response = cloudinary.api.resources(
-            type="upload",
-            prefix="mindfm/",      # folder prefix
-            resource_type="video", # because audio is uploaded as video/webm
-            max_results=100,
-            next_cursor=next_cursor
-        )
-        resources.extend(response["resources"])
-        next_cursor = response.get("next_cursor")
-        if not next_cursor:
-            break
-
-    return resources
-
-# === CATEGORIZE AND PRINT ===
-files = get_all_mindfm_files()
-music_data = []
-
-for res in files:
-    public_id = res["public_id"]
-    secure_url = res["secure_url"]
-
-    # Extract category from folder structure (mindfm/category/filename)
-    parts = public_id.split("/")
-    category = parts[1] if len(parts) > 1 else "unknown"
-    name = parts[-1].replace("_", " ")
-
-    music_data.append({
-        "name": name,
-        "category": category,
-        "url": secure_url
-    })
-
-# === PRINT OR SAVE ===
-print(json.dumps(music_data, indent=2))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "modelsrc_abhi", "modelsrc"))
+from music_catalogue import get_catalogue
 
-# Optional: save to file
-with open("mindfm_music_list.json", "w", encoding="utf-8") as f:
-    json.dump(music_data, f, indent=2)
-    print("✅ Saved as mindfm_music_list.json")
+catalogue = get_catalogue()
+print(json.dumps(catalogue.sync(), indent=2))
+count = catalogue.export_json("mindfm_music_list.json")
+print(f"✅ Saved {count} tracks as mindfm_music_list.json")
@@ -1,12 +1,22 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Literal, Optional
+import base64
+import importlib
+import json
 import logging
+import os
+import threading
+import time
 
-# Import the core functions from existing modules
-from multimodel_therapist import get_therapist_response
-from multimodel_friend import get_friend_response
-from fer import capture_emotion_from_video
+# Only light modules are imported at load time. The persona modules (langchain, FAISS,
+# HuggingFace) and fer (cv2 + DeepFace/TensorFlow) are imported inside the endpoints on
+# first use, or ahead of time by the background warm-up below.
+from llm_dispatcher import dispatcher, LLMQueueTimeout
+from readiness import readiness
+import tracing
 
 # ------------------------------------------------------------------------------
 # App Initialization and Configuration
@@ -19,6 +29,114 @@ app = FastAPI(title="Multi-Model Chat API", version="2.0.0")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("multi_model_chat_api")
 
+# Import/initialise the heavy stacks in parallel background threads right after startup;
+# /health/ready reports each one (see readiness.py)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+# Server-side FER only serves the webcam endpoints, so it does not gate readiness by default
+FER_REQUIRED_FOR_READY = os.getenv("FER_REQUIRED_FOR_READY", "0") == "1"
+HEAVY_MODULES = ("multimodel_therapist", "multimodel_friend", "fer")
+# Adds a Server-Timing header (per-stage durations) to every response; X-Trace-Id is always set
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "0") == "1"
+# Avatar proxy (backend-avatar/app.py) that /session can forward replies to
+AVATAR_PROXY_URL = os.getenv("AVATAR_PROXY_URL", "http://localhost:5000")
+AVATAR_TIMEOUT_SECONDS = float(os.getenv("AVATAR_TIMEOUT_SECONDS", "10"))
+# Background MindFM catalogue sync from Cloudinary (0 = only via POST /music/sync)
+MUSIC_SYNC_INTERVAL_SECONDS = float(os.getenv("MUSIC_SYNC_INTERVAL_SECONDS", "0"))
+# Longest /music/stream?wait=true waits for a track download before answering 504
+AUDIO_FETCH_TIMEOUT_SECONDS = float(os.getenv("AUDIO_FETCH_TIMEOUT_SECONDS", "60"))
+# Upcoming tracks one /music/stream request may prefetch (extra `next` URLs are ignored)
+MUSIC_PREFETCH_MAX = int(os.getenv("MUSIC_PREFETCH_MAX", "3"))
+# Start the TTS engine thread (and phrase-cache prewarm) at startup instead of on first /tts
+TTS_ON_STARTUP = os.getenv("TTS_ON_STARTUP", "0") == "1"
+TTS_SENTENCE_TIMEOUT_SECONDS = float(os.getenv("TTS_SENTENCE_TIMEOUT_SECONDS", "30"))
+# Runs the independent /session stages (FER on uploaded frames, retrieval) side by side
+_session_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="session")
+import_timings = {}
+
+
+def _import_timed(name: str):
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    import_timings.setdefault(name, round(time.perf_counter() - start, 3))
+    return module
+
+
+def _load_vector_index() -> dict:
+    therapist = _import_timed("multimodel_therapist")
+    vs = therapist.get_vectorstore()
+    lexical = therapist.get_lexical_index()
+    partitions = therapist.get_partitions()
+    return {"vectors": vs.index.ntotal, "bm25_terms": len(lexical.postings), "shards": partitions.sizes()}
+
+
+def _load_embedder() -> dict:
+    therapist = _import_timed("multimodel_therapist")
+    start = time.perf_counter()
+    therapist.get_embeddings().embed_query("warm up")
+    return {"first_embed_ms": round((time.perf_counter() - start) * 1000.0, 1)}
+
+
+def _probe_llm() -> dict:
+    from llm_dispatcher import probe_groq
+
+    _import_timed("multimodel_friend")
+    return probe_groq(os.getenv("GROQ_API_KEY"), os.getenv("GROQ_BASE_URL"))
+
+
+def _load_fer() -> dict:
+    _import_timed("fer").load_model()
+    return {}
+
+
+readiness.register("vector_index", _load_vector_index)
+readiness.register("embedder", _load_embedder)
+readiness.register("llm", _probe_llm)
+readiness.register("fer_model", _load_fer, required=FER_REQUIRED_FOR_READY)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Opens a trace per request (honouring an incoming X-Trace-Id) that pipeline stages add spans to."""
+    trace, token = tracing.start_trace(request.headers.get("x-trace-id"))
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        elapsed = time.perf_counter() - start
+        tracing.end_trace(token)
+    tracing.metrics.observe("request", elapsed)
+    tracing.metrics.inc("http_requests_total")
+    response.headers["X-Trace-Id"] = trace.trace_id
+    if SERVER_TIMING_HEADER:
+        timing = trace.server_timing()
+        response.headers["Server-Timing"] = (timing + ", " if timing else "") + f"total;dur={elapsed * 1000.0:.1f}"
+    if trace.spans:
+        logger.info(f"trace={trace.trace_id} {request.url.path} {elapsed * 1000.0:.1f}ms {trace.server_timing()}")
+    return response
+
+
+@app.on_event("startup")
+def start_warm_up():
+    if WARMUP_ON_STARTUP:
+        readiness.warm_up_in_background()
+    if MUSIC_SYNC_INTERVAL_SECONDS > 0:
+        threading.Thread(target=_music_sync_loop, name="music-sync", daemon=True).start()
+    if TTS_ON_STARTUP:
+        from tts import get_tts
+
+        get_tts()
+
+
+def _music_sync_loop():
+    from music_catalogue import get_catalogue
+
+    while True:
+        try:
+            get_catalogue().sync()
+        except Exception as e:
+            logger.warning(f"Music catalogue sync failed: {e}")
+        time.sleep(MUSIC_SYNC_INTERVAL_SECONDS)
+
 
 # ------------------------------------------------------------------------------
 # Request Models (Pydantic)
@@ -61,6 +179,44 @@ class FriendWithFERRequest(BaseModel):
     mode: str = Field(..., description="Friend reply mode")
     friend_name: str = Field(..., description="Name of the friend persona")
     fer_duration: int = Field(default=5, ge=1, le=30, description="Duration for FER capture in seconds")
+    speculative: bool = Field(default=False, description="Start the LLM call for the provisional emotion while FER is still capturing")
+    speculation: Literal["stable", "top2"] = Field(
+        default="stable",
+        description="'stable': one call once the leading emotion is stable; 'top2': calls for the two leading emotions",
+    )
+
+
+class SessionRequest(BaseModel):
+    """
+    Request schema for /session endpoint - sensors, optional frames and the message in one call.
+    """
+    query: str = Field(..., description="User's input message or question")
+    stress: float = Field(..., ge=0.0, description="Stress level as a float")
+    mood: str = Field(..., description="Self-reported mood (string label)")
+    fatigue: float = Field(..., ge=0.0, description="Fatigue level as a float")
+    recovery: float = Field(..., ge=0.0, description="Recovery level as a float")
+    fer_mood: Optional[str] = Field(default=None, description="Client-side FER label; used when no frames are sent")
+    frames: List[str] = Field(default_factory=list, max_length=30, description="Base64 JPEG/PNG frames for server-side FER")
+    avatar_session_id: Optional[str] = Field(default=None, description="Forward the reply to this avatar session")
+    avatar_task_type: str = Field(default="talk", description="Avatar task type (see avatar proxy /send_task)")
+
+
+class MusicRecommendRequest(BaseModel):
+    """
+    Request schema for /music/recommend endpoint.
+    """
+    fer_mood: Optional[str] = Field(default=None, description="Facial emotion recognition label")
+    mood: Optional[str] = Field(default=None, description="Self-reported mood (used when FER is missing/unknown)")
+    stress: Optional[float] = Field(default=None, ge=0.0, description="Stress level (0.0 to 1.0)")
+    fatigue: Optional[float] = Field(default=None, ge=0.0, description="Fatigue level (0.0 to 1.0)")
+    limit: int = Field(default=10, ge=1, le=50, description="Playlist length")
+
+
+class TTSRequest(BaseModel):
+    """
+    Request schema for /tts endpoint.
+    """
+    text: str = Field(..., min_length=1, max_length=5000, description="Text to speak (e.g. a persona reply)")
 
 
 # ------------------------------------------------------------------------------
@@ -68,13 +224,78 @@ class FriendWithFERRequest(BaseModel):
 # ------------------------------------------------------------------------------
 
 @app.get("/health")
+@app.get("/health/live")
 def health():
     """
-    Lightweight health probe for liveness/readiness checks.
+    Liveness probe: the process is up and serving HTTP. Does not touch any model.
     """
     return {"status": "ok"}
 
 
+@app.get("/health/ready")
+def health_ready():
+    """
+    Readiness probe: 200 once every required subsystem (vector index, embedder, LLM
+    reachability) has warmed up, 503 otherwise. The body always lists each subsystem's
+    state and load duration.
+    """
+    snapshot = readiness.snapshot()
+    if not snapshot["ready"]:
+        return JSONResponse(status_code=503, content=snapshot)
+    return snapshot
+
+
+@app.post("/health/warm-up")
+def health_warm_up(background_tasks: BackgroundTasks):
+    """
+    Retry warm-up of any subsystem that failed (e.g. LLM unreachable at startup).
+    """
+    background_tasks.add_task(readiness.warm_up)
+    return readiness.snapshot()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus text format: chat_stage_seconds histograms per stage (embed_query,
+    faiss_search, render_prompt, llm_queue_wait, llm_first_token, llm_total, fer_frame,
+    cache_lookup, request) plus counters.
+    """
+    return tracing.metrics.render()
+
+
+@app.get("/debug/imports")
+def import_profile():
+    """
+    Seconds spent importing each heavy module during warm-up (see import_profile.py for a full report).
+    """
+    return {"timings_seconds": import_timings, "pending": [m for m in HEAVY_MODULES if m not in import_timings]}
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    """
+    Shared Groq dispatcher counters (queue wait percentiles, retries, 429s, timeouts)
+    and per-persona prompt/completion token totals.
+    """
+    from prompt_builder import token_stats
+
+    return {**dispatcher.stats(), "tokens": token_stats.snapshot()}
+
+
+@app.get("/friend/cache/stats")
+def friend_cache_stats():
+    """
+    Semantic reply cache metrics for /friend (hit rate, size, evictions).
+    """
+    from multimodel_friend import get_response_cache
+
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
 # ------------------------------------------------------------------------------
 # FER Endpoints
 # ------------------------------------------------------------------------------
@@ -104,6 +325,8 @@ def fer_capture_endpoint(payload: FERCaptureRequest):
       "duration_seconds": int
     }
     """
+    from fer import capture_emotion_from_video
+
     try:
         logger.info(f"Starting FER capture for {payload.duration_seconds} seconds")
         emotion = capture_emotion_from_video(duration_seconds=payload.duration_seconds)
@@ -142,6 +365,8 @@ def therapist_endpoint(payload: TherapistRequest):
       "response": str
     }
     """
+    from multimodel_therapist import get_therapist_response
+
     try:
         logger.info("Received /therapist request")
         response_text = get_therapist_response(
@@ -153,6 +378,9 @@ def therapist_endpoint(payload: TherapistRequest):
             fer_mood=payload.fer_mood,
         )
         return {"response": response_text}
+    except LLMQueueTimeout as e:
+        logger.warning(f"/therapist rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     except Exception as e:
         logger.exception("Error in /therapist endpoint")
         raise HTTPException(status_code=500, detail=f"Therapist generation failed: {str(e)}")
@@ -176,6 +404,8 @@ def friend_endpoint(payload: FriendRequest):
       "response": str
     }
     """
+    from multimodel_friend import get_friend_response
+
     try:
         logger.info("Received /friend request")
         response_text = get_friend_response(
@@ -185,6 +415,9 @@ def friend_endpoint(payload: FriendRequest):
             fer_emotion=payload.fer_emotion,
         )
         return {"response": response_text}
+    except LLMQueueTimeout as e:
+        logger.warning(f"/friend rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     except Exception as e:
         logger.exception("Error in /friend endpoint")
         raise HTTPException(status_code=500, detail=f"Friend generation failed: {str(e)}")
@@ -209,36 +442,395 @@ def friend_with_fer_endpoint(payload: FriendWithFERRequest):
       "fer_duration": int (default: 5)
     }
     
+    With "speculative": true the LLM call for the provisional emotion starts while the
+    capture is still running (see speculation.SpeculativeResponder); if the final emotion
+    matches a started call its reply is used, otherwise the LLM is called as usual.
+
     Response JSON:
     {
       "response": str,
-      "detected_emotion": str
+      "detected_emotion": str,
+      "speculation_hit": bool,
+      "speculated_emotions": [str],
+      "timings_ms": {"fer": float, "llm_wait": float, "total": float}
     }
     """
+    from fer import capture_emotion_from_video
+    from multimodel_friend import get_friend_response, store_friend_reply
+    from speculation import SpeculativeResponder
+
     try:
         logger.info(f"Received /friend/with-fer request - capturing emotion for {payload.fer_duration}s")
-        
-        # Step 1: Capture emotion
-        detected_emotion = capture_emotion_from_video(duration_seconds=payload.fer_duration)
-        logger.info(f"Detected emotion: {detected_emotion}")
-        
-        # Step 2: Generate friend response with detected emotion
-        response_text = get_friend_response(
-            query=payload.query,
-            mode=payload.mode,
-            friend_name=payload.friend_name,
-            fer_emotion=detected_emotion,
+        start = time.perf_counter()
+
+        def generate(emotion: str) -> str:
+            return get_friend_response(
+                query=payload.query,
+                mode=payload.mode,
+                friend_name=payload.friend_name,
+                fer_emotion=emotion,
+                store=False,  # only the reply actually returned is cached (below)
+            )
+
+        speculator = SpeculativeResponder(generate, strategy=payload.speculation) if payload.speculative else None
+
+        # Step 1: Capture emotion (speculative LLM calls may start from the vote callback)
+        detected_emotion = capture_emotion_from_video(
+            duration_seconds=payload.fer_duration,
+            on_vote=speculator.on_vote if speculator else None,
         )
-        
+        fer_done = time.perf_counter()
+        logger.info(f"Detected emotion: {detected_emotion}")
+
+        # Step 2: Friend response for the detected emotion (reuses a speculative call on a hit)
+        if speculator:
+            response_text, hit = speculator.result(detected_emotion)
+            logger.info(f"Speculation {'hit' if hit else 'miss'}: launched={speculator.launched}")
+        else:
+            response_text, hit = generate(detected_emotion), False
+        end = time.perf_counter()
+        store_friend_reply(payload.query, payload.mode, payload.friend_name, detected_emotion, response_text)
+
         return {
             "response": response_text,
-            "detected_emotion": detected_emotion
+            "detected_emotion": detected_emotion,
+            "speculation_hit": hit,
+            "speculated_emotions": speculator.launched if speculator else [],
+            "timings_ms": {
+                "fer": round((fer_done - start) * 1000.0, 1),
+                "llm_wait": round((end - fer_done) * 1000.0, 1),
+                "total": round((end - start) * 1000.0, 1),
+            },
         }
+    except LLMQueueTimeout as e:
+        logger.warning(f"/friend/with-fer rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     except Exception as e:
         logger.exception("Error in /friend/with-fer endpoint")
         raise HTTPException(status_code=500, detail=f"Friend with FER generation failed: {str(e)}")
 
 
+@app.post("/session")
+def session_endpoint(payload: SessionRequest):
+    """
+    One round-trip for a therapist turn: replaces /fer/capture + /therapist + the avatar
+    proxy's /send_task.
+
+    FER over the uploaded frames and FAISS retrieval run concurrently, then the LLM is
+    called with the combined parameters; if avatar_session_id is given the reply is
+    forwarded to the avatar proxy (AVATAR_PROXY_URL). An avatar failure does not fail the
+    turn, it is reported under "avatar".
+
+    Request JSON:
+    {
+      "query": str,
+      "stress": float, "mood": str, "fatigue": float, "recovery": float,
+      "fer_mood": str (optional),
+      "frames": [base64 str] (optional),
+      "avatar_session_id": str (optional),
+      "avatar_task_type": str (default: "talk")
+    }
+
+    Response JSON:
+    {
+      "response": str,
+      "fer_mood": str,
+      "fer_source": "frames" | "client" | "default",
+      "avatar": {"forwarded": bool, "status_code": int, "error": str} | null,
+      "timings_ms": {"fer": float, "retrieval": float, "llm": float, "avatar": float, "total": float}
+    }
+    """
+    from multimodel_therapist import generate_therapist_reply, retrieve_therapist_context, therapist_parameters
+
+    def timed(fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, round((time.perf_counter() - start) * 1000.0, 1)
+
+    try:
+        logger.info(f"Received /session request ({len(payload.frames)} frames)")
+        start = time.perf_counter()
+        timings = {"fer": 0.0}
+
+        # Stage 1: FER and retrieval side by side
+        # The shard is picked from the client-reported state; frame FER is not known yet
+        client_state = therapist_parameters(payload.stress, payload.mood, payload.fatigue, payload.recovery,
+                                            payload.fer_mood or "neutral")
+        retrieval = _session_pool.submit(tracing.bind(timed), retrieve_therapist_context, payload.query, client_state)
+        fer_mood, fer_source = payload.fer_mood, "client" if payload.fer_mood else "default"
+        if payload.frames:
+            from fer import analyze_encoded_frames
+
+            detected, timings["fer"] = _session_pool.submit(tracing.bind(timed), analyze_encoded_frames, payload.frames).result()
+            if detected:
+                fer_mood, fer_source = detected, "frames"
+        fer_mood = fer_mood or "neutral"
+        context, timings["retrieval"] = retrieval.result()
+
+        # Stage 2: LLM
+        parameters = therapist_parameters(payload.stress, payload.mood, payload.fatigue, payload.recovery, fer_mood)
+        response_text, timings["llm"] = timed(generate_therapist_reply, payload.query, parameters, context)
+
+        # Stage 3: optional avatar forwarding
+        avatar = None
+        if payload.avatar_session_id:
+            avatar, timings["avatar"] = timed(
+                _forward_to_avatar, payload.avatar_session_id, response_text, payload.avatar_task_type
+            )
+        timings["total"] = round((time.perf_counter() - start) * 1000.0, 1)
+        logger.info(f"/session timings: {timings}")
+
+        return {
+            "response": response_text,
+            "fer_mood": fer_mood,
+            "fer_source": fer_source,
+            "avatar": avatar,
+            "timings_ms": timings,
+        }
+    except LLMQueueTimeout as e:
+        logger.warning(f"/session rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    except Exception as e:
+        logger.exception("Error in /session endpoint")
+        raise HTTPException(status_code=500, detail=f"Session turn failed: {str(e)}")
+
+
+def _forward_to_avatar(session_id: str, text: str, task_type: str) -> dict:
+    import requests
+
+    try:
+        resp = requests.post(
+            f"{AVATAR_PROXY_URL.rstrip('/')}/send_task",
+            json={"session_id": session_id, "text": text, "task_type": task_type},
+            timeout=AVATAR_TIMEOUT_SECONDS,
+        )
+        result = {"forwarded": resp.ok, "status_code": resp.status_code}
+        if not resp.ok:
+            result["error"] = resp.text[:500]
+        return result
+    except Exception as e:
+        logger.warning(f"Avatar forwarding failed: {e}")
+        return {"forwarded": False, "status_code": None, "error": str(e)}
+
+
+# ------------------------------------------------------------------------------
+# MindFM Music Catalogue
+# ------------------------------------------------------------------------------
+
+@app.get("/music/tracks")
+def music_tracks(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=50, ge=1, le=200),
+):
+    """
+    Paginated MindFM catalogue (newest first), optionally filtered by category.
+
+    Replaces shipping the whole mindfm_music_list.json with the app. Responses carry an
+    ETag derived from the catalogue version; send it back as If-None-Match to get a 304
+    when nothing changed since the last sync.
+
+    Response JSON:
+    {
+      "items": [{"name", "category", "url", "format", "bytes", "duration", "created_at"}],
+      "page": int, "page_size": int, "total": int, "version": int
+    }
+    """
+    from music_catalogue import get_catalogue
+
+    catalogue = get_catalogue()
+    etag = f'"{catalogue.version}-{category or "all"}-{page}-{page_size}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return catalogue.page(category=category, page=page, page_size=page_size)
+
+
+@app.post("/music/recommend")
+def music_recommend(payload: MusicRecommendRequest):
+    """
+    Ranked MindFM playlist for the user's current state, in one call.
+
+    fer_mood (or mood), stress and fatigue are bucketed (emotion x low/mid/high levels),
+    mapped to weighted categories and ranked over a per-catalogue-version track index;
+    results are cached per bucket.
+
+    Response JSON:
+    {
+      "bucket": {"emotion": str, "stress": str, "fatigue": str},
+      "categories": {category: weight},
+      "playlist": [{"name", "category", "url", "score", ...}],
+      "cached": bool
+    }
+    """
+    from music_recommender import recommender
+
+    try:
+        return recommender.recommend(
+            fer_mood=payload.fer_mood,
+            mood=payload.mood,
+            stress=payload.stress,
+            fatigue=payload.fatigue,
+            limit=payload.limit,
+        )
+    except Exception as e:
+        logger.exception("Error in /music/recommend endpoint")
+        raise HTTPException(status_code=500, detail=f"Music recommendation failed: {str(e)}")
+
+
+@app.get("/music/categories")
+def music_categories():
+    """
+    Track count per category.
+    """
+    from music_catalogue import get_catalogue
+
+    return {"categories": get_catalogue().categories()}
+
+
+@app.post("/music/sync")
+def music_sync(full: bool = False):
+    """
+    Pull new tracks from Cloudinary (only those newer than the last sync unless full=true,
+    which re-lists everything and drops deleted tracks).
+    """
+    from music_catalogue import get_catalogue
+
+    try:
+        return get_catalogue().sync(full=full)
+    except Exception as e:
+        logger.exception("Error in /music/sync endpoint")
+        raise HTTPException(status_code=502, detail=f"Catalogue sync failed: {str(e)}")
+
+
+@app.get("/music/stream")
+def music_stream(
+    request: Request,
+    url: str,
+    prefetch: List[str] = Query(default=[], alias="next", description="upcoming playlist URLs to prefetch"),
+    wait: bool = False,
+):
+    """
+    Caching byte-range proxy for MindFM tracks.
+
+    Cached tracks are served from a memory map of the local file with Range support, so the
+    player can seek and resume without touching the origin. On a miss the track is
+    downloaded in the background and the client is redirected (307) to the origin so
+    playback starts immediately; wait=true downloads first and serves from the cache.
+    The first MUSIC_PREFETCH_MAX URLs in `next` (the following playlist entries) are
+    prefetched in the background.
+    Only hosts in AUDIO_CACHE_ALLOWED_HOSTS are proxied.
+    """
+    from concurrent.futures import TimeoutError as FetchTimeout
+
+    from audio_cache import RangeNotSatisfiable, get_audio_cache, iter_mmap, parse_range
+
+    cache = get_audio_cache()
+    try:
+        for upcoming in prefetch[:MUSIC_PREFETCH_MAX]:
+            cache.fetch(upcoming, prefetch=True)
+        mapped = cache.open(url)
+        if mapped is None:
+            if not wait:
+                cache.fetch(url)
+                return RedirectResponse(url, status_code=307)
+            cache.fetch(url).result(timeout=AUDIO_FETCH_TIMEOUT_SECONDS)
+            mapped = cache.open(url)
+            if mapped is None:
+                raise RuntimeError("track was evicted before it could be served")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FetchTimeout:
+        raise HTTPException(status_code=504, detail=f"Track download exceeded {AUDIO_FETCH_TIMEOUT_SECONDS:.0f}s")
+    except Exception as e:
+        logger.exception("Error in /music/stream endpoint")
+        raise HTTPException(status_code=502, detail=f"Track fetch failed: {str(e)}")
+
+    size = len(mapped)
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=86400"}
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        mapped.close()
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        iter_mmap(mapped, start, end),
+        status_code=206 if byte_range is not None else 200,
+        media_type=cache.media_type(url),
+        headers=headers,
+    )
+
+
+@app.get("/music/cache/stats")
+def music_cache_stats():
+    """
+    Audio cache hit/miss/download/eviction counters and current size.
+    """
+    from audio_cache import get_audio_cache
+
+    return get_audio_cache().stats()
+
+
+# ------------------------------------------------------------------------------
+# Text-to-Speech
+# ------------------------------------------------------------------------------
+
+@app.post("/tts")
+def text_to_speech(payload: TTSRequest):
+    """
+    Offline TTS (pyttsx3), streamed sentence by sentence as NDJSON.
+
+    One engine lives in a dedicated worker thread; all sentences are queued at once and
+    each line is sent as soon as its audio is ready, so playback can start after the first
+    sentence. Repeated phrases (greetings, acknowledgements) come from an in-memory cache.
+
+    Response (application/x-ndjson), one line per sentence:
+    {"index": int, "text": str, "format": "wav"|"aiff", "audio": base64, "cached": bool}
+    followed by {"done": true, "sentences": int} or {"error": str}.
+    """
+    from tts import audio_format, get_tts
+
+    worker = get_tts()
+
+    def lines():
+        count = 0
+        try:
+            for count, (sentence, audio, cached) in enumerate(
+                worker.stream(payload.text, timeout=TTS_SENTENCE_TIMEOUT_SECONDS), start=1
+            ):
+                yield json.dumps({
+                    "index": count - 1,
+                    "text": sentence,
+                    "format": audio_format(audio),
+                    "audio": base64.b64encode(audio).decode("ascii"),
+                    "cached": cached,
+                }) + "\n"
+        except Exception as e:
+            logger.exception("Error in /tts endpoint")
+            yield json.dumps({"error": f"Speech synthesis failed: {str(e)}"}) + "\n"
+            return
+        yield json.dumps({"done": True, "sentences": count}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/tts/stats")
+def tts_stats():
+    """
+    TTS sentence count, phrase-cache hits/size and engine queue depth.
+    """
+    from tts import get_tts
+
+    return get_tts().stats()
+
+
 # ------------------------------------------------------------------------------
 # Run Instructions
 # ------------------------------------------------------------------------------
@@ -247,11 +839,22 @@ def friend_with_fer_endpoint(payload: FriendWithFERRequest):
 #   uvicorn app:app --reload
 #
 # The server will expose:
-# - GET  /health
+# - GET  /health, /health/live (liveness)
+# - GET  /health/ready (per-subsystem readiness, 503 until warmed up)
+# - GET  /debug/imports (warm-up import timings)
+# - GET  /metrics (Prometheus per-stage latency histograms; SERVER_TIMING_HEADER=1 adds Server-Timing)
+# - GET  /llm/stats (Groq dispatcher queue/retry metrics)
+# - GET  /friend/cache/stats (semantic reply cache, enable with FRIEND_CACHE_ENABLED=1)
 # - POST /therapist
 # - POST /friend (with optional fer_emotion parameter)
 # - POST /fer/capture (standalone FER capture)
 # - POST /friend/with-fer (captures FER then responds - recommended for your use case)
+# - POST /session (sensors + optional frames + message -> therapist reply, optional avatar forward)
+# - GET  /music/tracks?category=&page=&page_size= (ETag / If-None-Match), GET /music/categories
+# - POST /music/recommend (fer_mood/mood + stress/fatigue -> ranked playlist, cached per mood bucket)
+# - POST /music/sync?full=false (incremental Cloudinary sync; MUSIC_SYNC_INTERVAL_SECONDS for periodic)
+# - GET  /music/stream?url=&next= (disk-cached Range proxy, LRU capped by AUDIO_CACHE_MAX_MB), GET /music/cache/stats
+# - POST /tts (sentence-by-sentence NDJSON audio from one long-lived pyttsx3 engine), GET /tts/stats
 #
 # RECOMMENDED WORKFLOW:
 # Use the /friend/with-fer endpoint which will:
@@ -264,5 +867,7 @@ def friend_with_fer_endpoint(payload: FriendWithFERRequest):
 #   "query": "Hey, how's it going?",
 #   "mode": "caring",
 #   "friend_name": "Sunny",
-#   "fer_duration": 5
+#   "fer_duration": 5,
+#   "speculative": true,        # optional: overlap the LLM call with FER capture
+#   "speculation": "stable"     # or "top2" (more LLM calls, higher hit rate)
 # }
\ No newline at end of file
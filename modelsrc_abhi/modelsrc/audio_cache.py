@@ -0,0 +1,260 @@
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import tracing
+
+logger = logging.getLogger("audio_cache")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(BASE_DIR, "audio_cache"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_MB", "1024")) * 1024 * 1024
+# Only these hosts are proxied or followed on redirect (the catalogue lives on Cloudinary);
+# add localhost for tests
+AUDIO_CACHE_ALLOWED_HOSTS = {
+    h.strip() for h in os.getenv("AUDIO_CACHE_ALLOWED_HOSTS", "res.cloudinary.com").split(",") if h.strip()
+}
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+STREAM_CHUNK_BYTES = 256 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 30.0
+MAX_REDIRECTS = 3
+
+MEDIA_TYPES = {".webm": "audio/webm", ".mp3": "audio/mpeg", ".m4a": "audio/mp4", ".ogg": "audio/ogg",
+               ".wav": "audio/wav"}
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """`Range: bytes=a-b` -> inclusive (start, end), None for a full response.
+
+    Multi-range requests are answered with the first range only.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].split(",")[0].strip()
+    start_s, _, end_s = spec.partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:  # suffix range: last N bytes
+            start, end = max(0, size - int(end_s)), size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise RangeNotSatisfiable(f"bytes {start}-{end} outside 0-{size - 1}")
+    return start, end
+
+
+def iter_mmap(mm: mmap.mmap, start: int, end: int, chunk: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield bytes [start, end] of a memory map in `chunk`-sized bytes objects; closes it when done.
+
+    Each chunk is still copied out of the map (the ASGI server needs bytes). The map is used
+    so a response keeps reading the file it started on after `_evict` unlinks it.
+    """
+    try:
+        pos = end + 1
+        offset = start
+        while offset < pos:
+            stop = min(offset + chunk, pos)
+            yield mm[offset:stop]
+            offset = stop
+    finally:
+        mm.close()
+
+
+class AudioCache:
+    """On-disk LRU cache of remote tracks.
+
+    Files are named by a hash of the URL. Last use is kept in memory (seeded from file
+    mtimes at startup) and the least recently used files are evicted once the total
+    exceeds `max_bytes`. Concurrent requests for the same URL share one download.
+    """
+
+    def __init__(self, cache_dir: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+                 allowed_hosts=frozenset(AUDIO_CACHE_ALLOWED_HOSTS), workers: int = 2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.allowed_hosts = set(allowed_hosts)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, float]] = {}  # filename -> (size, last used)
+        self._inflight: Dict[str, Future] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-fetch")
+        self._counters = {"hits": 0, "misses": 0, "downloads": 0, "downloaded_bytes": 0, "evictions": 0,
+                          "prefetches": 0}
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.endswith(".part"):
+                os.remove(path)
+            elif os.path.isfile(path):
+                st = os.stat(path)
+                if st.st_size:
+                    self._entries[name] = (st.st_size, st.st_mtime)
+
+    def _check_host(self, url: str) -> None:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.hostname not in self.allowed_hosts:
+            raise ValueError(f"URL host not allowed for audio caching: {parsed.hostname}")
+
+    def _filename(self, url: str) -> str:
+        self._check_host(url)
+        parsed = urlparse(url)
+        ext = os.path.splitext(parsed.path)[1].lower()
+        return hashlib.sha256(url.encode()).hexdigest()[:32] + (ext if ext in MEDIA_TYPES else "")
+
+    def media_type(self, url: str) -> str:
+        return MEDIA_TYPES.get(os.path.splitext(urlparse(url).path)[1].lower(), "application/octet-stream")
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Local path if `url` is cached (marks it recently used), else None."""
+        name = self._filename(url)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._counters["misses"] += 1
+                tracing.metrics.inc("audio_cache_misses_total")
+                return None
+            self._entries[name] = (entry[0], time.time())
+            self._counters["hits"] += 1
+        tracing.metrics.inc("audio_cache_hits_total")
+        return os.path.join(self.cache_dir, name)
+
+    def open(self, url: str) -> Optional[mmap.mmap]:
+        """Read-only map of the cached track, or None on a miss.
+
+        Mapping happens here rather than when streaming starts: once mapped, the data
+        stays readable even if `_evict` unlinks the file meanwhile. A file that vanished
+        since `lookup` is dropped from the index and treated as a miss.
+        """
+        path = self.lookup(url)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(os.path.basename(path), None)
+            return None
+
+    def fetch(self, url: str, prefetch: bool = False) -> Future:
+        """Start (or join) the download of `url`; the Future resolves to the local path."""
+        name = self._filename(url)
+        with self._lock:
+            if name in self._entries:
+                done = Future()
+                done.set_result(os.path.join(self.cache_dir, name))
+                return done
+            future = self._inflight.get(name)
+            if future is None:
+                future = self._pool.submit(self._download, url, name)
+                self._inflight[name] = future
+                if prefetch:
+                    self._counters["prefetches"] += 1
+            return future
+
+    def get(self, url: str, timeout: Optional[float] = None) -> str:
+        """Local path for `url`, downloading it first if needed."""
+        return self.lookup(url) or self.fetch(url).result(timeout=timeout)
+
+    def _download(self, url: str, name: str) -> str:
+        import requests
+
+        path = os.path.join(self.cache_dir, name)
+        tmp = path + ".part"
+        start = time.perf_counter()
+        try:
+            with self._get(requests, url) as response:
+                response.raise_for_status()
+                size = 0
+                with open(tmp, "wb") as f:
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                        f.write(chunk)
+                        size += len(chunk)
+            if size == 0:
+                raise RuntimeError("origin returned an empty body")
+            os.replace(tmp, path)
+            with self._lock:
+                self._entries[name] = (size, time.time())
+                self._counters["downloads"] += 1
+                self._counters["downloaded_bytes"] += size
+            tracing.metrics.inc("audio_cache_downloaded_bytes_total", size)
+            logger.info(f"Cached {size / 1e6:.1f} MB from {urlparse(url).path} in {time.perf_counter() - start:.1f}s")
+            self._evict(keep=name)
+            return path
+        except Exception as e:
+            logger.warning(f"Download of {url} failed: {e}")
+            raise
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            with self._lock:
+                self._inflight.pop(name, None)
+
+    def _get(self, requests, url: str):
+        """Streaming GET that follows redirects only to allowed hosts."""
+        for _ in range(MAX_REDIRECTS + 1):
+            response = requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            response.close()
+            url = urljoin(url, response.headers["location"])
+            try:
+                self._check_host(url)
+            except ValueError as e:  # the origin's fault, not the client's: surfaces as 502
+                raise RuntimeError(f"redirected to a disallowed host: {e}")
+        raise RuntimeError(f"more than {MAX_REDIRECTS} redirects")
+
+    def _evict(self, keep: str) -> None:
+        with self._lock:
+            total = sum(size for size, _ in self._entries.values())
+            victims = []
+            for name, (size, _) in sorted(self._entries.items(), key=lambda kv: kv[1][1]):
+                if total <= self.max_bytes:
+                    break
+                if name == keep:
+                    continue
+                victims.append(name)
+                total -= size
+            for name in victims:
+                del self._entries[name]
+                self._counters["evictions"] += 1
+        for name in victims:
+            try:
+                # an open mmap keeps serving the unlinked file until the response ends
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError as e:
+                logger.warning(f"Could not evict {name}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "files": len(self._entries),
+                "bytes": sum(size for size, _ in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "downloading": len(self._inflight),
+            }
+
+
+_CACHE: Optional[AudioCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = AudioCache()
+        return _CACHE
@@ -0,0 +1,118 @@
+"""Recall/latency/memory benchmark for the FAISS index types in vector_index.py.
+
+Every candidate is compared with an exact flat index over the same vectors:
+recall@k (fraction of the flat top-k recovered), single-query latency percentiles,
+bytes per vector of the serialized index and build time.
+
+Usage:
+    python benchmark_index.py                                  # embed the corpus (MiniLM)
+    python benchmark_index.py --synthetic 200000 --dim 384     # clustered random vectors, no model
+    python benchmark_index.py --types flat hnsw ivfpq --queries 500 --json out.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from vector_index import INDEX_PRESETS, apply_search_params, build_index, bytes_per_vector, resolve_spec
+
+
+def corpus_vectors(path: str, queries: int):
+    from multimodel_therapist import get_embeddings, load_json_data
+
+    docs = load_json_data(path)
+    texts = [d.page_content for d in docs]
+    embeddings = get_embeddings()
+    base = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+    rng = np.random.default_rng(0)
+    # Queries: perturbed corpus texts stand in for real user messages
+    picks = rng.choice(len(base), size=min(queries, len(base)), replace=False)
+    q = base[picks] + rng.normal(scale=0.02, size=(len(picks), base.shape[1])).astype("float32")
+    return base, q
+
+
+def synthetic_vectors(n: int, dim: int, queries: int, clusters: int = 256):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    assign = rng.integers(0, clusters, size=n)
+    base = centers[assign] + rng.normal(scale=0.5, size=(n, dim)).astype("float32")
+    q_assign = rng.integers(0, clusters, size=queries)
+    q = centers[q_assign] + rng.normal(scale=0.5, size=(queries, dim)).astype("float32")
+    return base, q
+
+
+def bench(index, queries, k: int):
+    ids = np.empty((len(queries), k), dtype="int64")
+    latencies = []
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        ids[i] = found[0]
+    return ids, np.asarray(latencies)
+
+
+def recall_at_k(truth, found) -> float:
+    hits = sum(len(set(t) & set(f[f >= 0])) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="combined_dataset_fixed.json")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead of the corpus")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_PRESETS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        base, queries = synthetic_vectors(args.synthetic, args.dim, args.queries)
+    else:
+        base, queries = corpus_vectors(args.data, args.queries)
+    print(f"{len(base)} vectors x {base.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    flat = build_index(base, "Flat")
+    truth, _ = bench(flat, queries, args.k)
+
+    results = []
+    print(f"{'type':<14} {'spec':<22} {'recall@k':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'B/vector':>9} {'build s':>8}")
+    for index_type in args.types:
+        spec = resolve_spec(index_type, len(base), base.shape[1])
+        start = time.perf_counter()
+        try:
+            index = build_index(base, spec)
+        except Exception as e:
+            print(f"{index_type:<14} {spec:<22} FAILED: {e}")
+            continue
+        build_s = time.perf_counter() - start
+        apply_search_params(index, nprobe=args.nprobe, ef_search=args.ef_search)
+        found, lat = bench(index, queries, args.k)
+        row = {
+            "type": index_type,
+            "spec": spec,
+            "recall_at_k": round(recall_at_k(truth, found), 4),
+            "p50_ms": round(float(np.percentile(lat, 50)), 3),
+            "p95_ms": round(float(np.percentile(lat, 95)), 3),
+            "p99_ms": round(float(np.percentile(lat, 99)), 3),
+            "bytes_per_vector": round(bytes_per_vector(index), 1),
+            "build_seconds": round(build_s, 2),
+        }
+        results.append(row)
+        print(f"{index_type:<14} {spec:<22} {row['recall_at_k']:>8.3f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} "
+              f"{row['p99_ms']:>8.3f} {row['bytes_per_vector']:>9.1f} {row['build_seconds']:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"n": len(base), "dim": int(base.shape[1]), "k": args.k, "nprobe": args.nprobe,
+                       "ef_search": args.ef_search, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
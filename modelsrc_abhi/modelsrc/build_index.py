@@ -0,0 +1,44 @@
+"""Build the therapist FAISS/BM25 index from a dataset.
+
+Usage:
+    python build_index.py                                   # combined_dataset_fixed.json
+    python build_index.py corpus.jsonl --batch-size 512     # streams (JSONL always does)
+    python build_index.py big.json --streaming              # force the streaming path
+
+Index type, compaction and partitioning follow the usual env vars (FAISS_INDEX_TYPE,
+FAISS_COMPACT_THRESHOLD, ...); see multimodel_therapist.py.
+"""
+import argparse
+import json
+import logging
+import time
+
+import multimodel_therapist as therapist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", nargs="?", default=therapist.DATA_PATH)
+    parser.add_argument("--batch-size", type=int, default=therapist.EMBED_BATCH_SIZE)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--streaming", action="store_true", help="always use the streaming path")
+    mode.add_argument("--in-memory", action="store_true", help="always load the whole file first")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    streaming = args.streaming or (
+        not args.in_memory and (args.data.endswith(".jsonl") or therapist.use_streaming(args.data))
+    )
+    if streaming:
+        # the report is enough here; loading the result would read the whole docstore back in
+        report = therapist.build_faiss_index_streaming(args.data, batch_size=args.batch_size)
+        print(json.dumps(report, indent=2))
+        vectors = report["vectors"]
+    else:
+        vectors = therapist.build_faiss_index(therapist.load_json_data(args.data)).index.ntotal
+    print(f"{vectors} vectors written to {therapist.FAISS_INDEX_PATH} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
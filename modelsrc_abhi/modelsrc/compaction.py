@@ -0,0 +1,250 @@
+"""Near-duplicate compaction of the counselling corpus before indexing.
+
+Contexts are MinHashed over word shingles and bucketed with LSH banding; candidate
+pairs whose estimated Jaccard similarity clears the threshold are merged (union-find)
+into one Document that keeps every distinct response as a candidate.
+
+Usage:
+    python compaction.py combined_dataset_fixed.json --threshold 0.8
+"""
+import argparse
+import hashlib
+import json
+import logging
+import re
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger("compaction")
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs at Jaccard 0.8 collide with ~99.96% probability
+SHINGLE_WORDS = 3
+MAX_RESPONSES = 5
+MAX_BUCKET = 64
+_PRIME = (1 << 61) - 1
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def _permutations(n: int) -> List[Tuple[int, int]]:
+    perms = []
+    for i in range(n):
+        digest = hashlib.blake2b(f"perm-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little") % _PRIME or 1
+        b = int.from_bytes(digest[8:], "little") % _PRIME
+        perms.append((a, b))
+    return perms
+
+
+_PERMS = _permutations(NUM_PERM)
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(items: set) -> Tuple[int, ...]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in items]
+    if not hashes:
+        return tuple([_PRIME] * NUM_PERM)
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def estimated_jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x: int, y: int) -> None:
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+
+def compact_documents(docs: List[Document], threshold: float = 0.8,
+                      max_responses: int = MAX_RESPONSES) -> Tuple[List[Document], dict]:
+    """Merge near-duplicate Documents.
+
+    Args:
+        docs: Documents from ingestion.rows_to_documents (response in metadata["response"]).
+        threshold: Minimum estimated Jaccard similarity of context shingles to merge.
+        max_responses: Distinct responses kept per merged document.
+
+    Returns:
+        (compacted documents, report dict)
+    """
+    signatures = [minhash(shingles(d.page_content)) for d in docs]
+    rows = NUM_PERM // BANDS
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for i, sig in enumerate(signatures):
+        for band in range(BANDS):
+            buckets.setdefault((band, sig[band * rows:(band + 1) * rows]), []).append(i)
+
+    uf = _UnionFind(len(docs))
+    compared = set()
+    for members in buckets.values():
+        if len(members) > MAX_BUCKET:
+            # degenerate bucket (e.g. very short texts): compare neighbours only
+            pairs = zip(members, members[1:])
+        else:
+            pairs = ((i, j) for n, i in enumerate(members) for j in members[n + 1:])
+        for i, j in pairs:
+            if (i, j) in compared or uf.find(i) == uf.find(j):
+                continue
+            compared.add((i, j))
+            if estimated_jaccard(signatures[i], signatures[j]) >= threshold:
+                uf.union(i, j)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(docs)):
+        clusters.setdefault(uf.find(i), []).append(i)
+
+    compacted: List[Document] = []
+    for root, members in clusters.items():
+        head = docs[root]
+        responses: List[str] = []
+        for m in members:
+            response = docs[m].metadata.get("response")
+            if response and response not in responses and len(responses) < max_responses:
+                responses.append(response)
+        metadata = dict(head.metadata)
+        if len(members) > 1:
+            metadata["ids"] = [docs[m].metadata.get("id", m) for m in members]
+            metadata["responses"] = responses
+            metadata["tags"] = sorted({t for m in members for t in docs[m].metadata.get("tags", ())})
+        compacted.append(Document(page_content=head.page_content, metadata=metadata))
+
+    report = {
+        "documents_in": len(docs),
+        "vectors_out": len(compacted),
+        "clusters_merged": sum(1 for members in clusters.values() if len(members) > 1),
+        "reduction_pct": round(100.0 * (1 - len(compacted) / len(docs)), 1) if docs else 0.0,
+        "threshold": threshold,
+    }
+    logger.info(f"Corpus compaction: {report}")
+    return compacted, report
+
+
+class StreamingCompactor:
+    """Online variant of compact_documents for corpora streamed in one pass.
+
+    Per accepted document it keeps one row of a uint64 signature array (NUM_PERM * 8 =
+    512 bytes) and a position in BANDS LSH buckets keyed by an int hash of the band, roughly
+    2 KB in all; the text itself is not kept. Buckets stop growing at MAX_BUCKET, the
+    most `add` ever compares against. A document whose context matches an earlier one is
+    folded into it: `add` returns the earlier position and its response/tags/ids are
+    recorded in `merged`, to be applied when the docstore is written.
+    """
+
+    def __init__(self, threshold: float = 0.8, max_responses: int = MAX_RESPONSES, capacity: int = 1024):
+        import numpy as np
+
+        self.threshold = threshold
+        self.max_responses = max_responses
+        self._signatures = np.empty((max(1, capacity), NUM_PERM), dtype=np.uint64)
+        self._count = 0
+        # band hash -> position, or a list of positions once several documents share it
+        self._buckets: Dict[int, object] = {}
+        self.merged: Dict[int, dict] = {}
+        self.documents_in = 0
+
+    def _band_keys(self, sig) -> List[int]:
+        rows = NUM_PERM // BANDS
+        return [hash((band, sig[band * rows:(band + 1) * rows].tobytes())) for band in range(BANDS)]
+
+    def add(self, doc: Document, position: int) -> int:
+        """Returns `position` if `doc` is new, else the position of the document it joins."""
+        import numpy as np
+
+        self.documents_in += 1
+        sig = np.array(minhash(shingles(doc.page_content)), dtype=np.uint64)
+        keys = self._band_keys(sig)
+        candidates: Dict[int, None] = {}  # ordered set: earliest bucket members first
+        for key in keys:
+            members = self._buckets.get(key)
+            if members is not None:
+                candidates.update(dict.fromkeys(members if isinstance(members, list) else (members,)))
+        if candidates:
+            # band hashes can collide across bands; the signature comparison settles it
+            candidates = list(candidates)
+            similarity = (self._signatures[candidates] == sig).mean(axis=1)
+            for other, score in zip(candidates, similarity):
+                if score >= self.threshold:
+                    self._fold(other, doc)
+                    return other
+        assert position == self._count, "positions must be added in order"
+        if self._count == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[self._count] = sig
+        self._count += 1
+        for key in keys:
+            members = self._buckets.get(key)
+            if members is None:
+                self._buckets[key] = position
+            elif not isinstance(members, list):
+                self._buckets[key] = [members, position]
+            elif len(members) < MAX_BUCKET:
+                members.append(position)
+        return position
+
+    def _fold(self, position: int, doc: Document) -> None:
+        extra = self.merged.setdefault(position, {"ids": [], "responses": [], "tags": set()})
+        extra["ids"].append(doc.metadata.get("id"))
+        extra["tags"].update(doc.metadata.get("tags", ()))
+        response = doc.metadata.get("response")
+        if response and response not in extra["responses"] and len(extra["responses"]) < self.max_responses:
+            extra["responses"].append(response)
+
+    def apply(self, position: int, metadata: dict) -> dict:
+        """Metadata of the document at `position` with everything folded into it."""
+        extra = self.merged.get(position)
+        if not extra:
+            return metadata
+        metadata = dict(metadata)
+        responses = [metadata["response"]] if metadata.get("response") else []
+        responses += [r for r in extra["responses"] if r not in responses]
+        metadata["ids"] = [metadata.get("id")] + extra["ids"]
+        metadata["responses"] = responses[: self.max_responses]
+        metadata["tags"] = sorted(set(metadata.get("tags", ())) | extra["tags"])
+        return metadata
+
+    def report(self) -> dict:
+        vectors = self._count
+        return {
+            "documents_in": self.documents_in,
+            "vectors_out": vectors,
+            "clusters_merged": len(self.merged),
+            "reduction_pct": round(100.0 * (1 - vectors / self.documents_in), 1) if self.documents_in else 0.0,
+            "threshold": self.threshold,
+        }
+
+
+def main():
+    from ingestion import rows_to_documents
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", help="JSON dataset (list of rows)")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    with open(args.data, "r") as f:
+        docs = rows_to_documents(json.load(f))
+    _, report = compact_documents(docs, threshold=args.threshold)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Local fake of the Groq (OpenAI-compatible) chat-completions API, plus a load check for
+llm_dispatcher.
+
+The server answers /openai/v1/models and /openai/v1/chat/completions (plain and SSE
+streaming) after a fixed latency, and returns 429 with Retry-After once more than
+--rps requests arrive within a second. Point the personas at it with
+GROQ_BASE_URL=http://127.0.0.1:8099 GROQ_API_KEY=fake.
+
+`load` starts the server in-process and fires concurrent requests through an
+LLMDispatcher. It checks that every request completes, that concurrency stays under the
+cap, and that 429s are retried. It exits non-zero on failure.
+
+Usage:
+    python fake_groq.py serve --port 8099 --rps 2 --latency 0.3
+    python fake_groq.py load --requests 40 --callers 16 --max-concurrency 4 --rps 5
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_dispatcher import LLMDispatcher
+
+
+class FakeGroq(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, rps: float, latency: float, reply: str):
+        super().__init__(address, _Handler)
+        self.rps = rps
+        self.latency = latency
+        self.reply = reply
+        self.lock = threading.Lock()
+        self.arrivals = deque()
+        self.active = 0
+        self.peak_active = 0
+        self.counts = {"requests": 0, "rate_limited": 0}
+
+    def admit(self) -> bool:
+        """Sliding one-second window; False means answer 429."""
+        now = time.monotonic()
+        with self.lock:
+            self.counts["requests"] += 1
+            while self.arrivals and now - self.arrivals[0] > 1.0:
+                self.arrivals.popleft()
+            if self.rps > 0 and len(self.arrivals) >= self.rps:
+                self.counts["rate_limited"] += 1
+                return False
+            self.arrivals.append(now)
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            return True
+
+    def done(self) -> None:
+        with self.lock:
+            self.active -= 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeGroq
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status: int, body: dict, headers=None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/openai/v1/models":
+            self._json(200, {"object": "list", "data": [{"id": "llama-3.1-8b-instant", "object": "model"}]})
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/openai/v1/chat/completions":
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.server.admit():
+            self._json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                       headers={"Retry-After": "0.2"})
+            return
+        try:
+            time.sleep(self.server.latency)
+            model = request.get("model", "fake")
+            usage = {"prompt_tokens": 10, "completion_tokens": len(self.server.reply.split()), "total_tokens": 0}
+            if request.get("stream"):
+                self._stream(model)
+            else:
+                self._json(200, {
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": self.server.reply}}],
+                    "usage": usage,
+                })
+        finally:
+            self.server.done()
+
+    def _stream(self, model: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = self.server.reply.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                             "finish_reason": "stop" if i == len(words) - 1 else None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class _HTTPStatusError(RuntimeError):
+    """Carries status_code/response like the Groq client errors the dispatcher inspects."""
+
+    def __init__(self, status_code: int, headers):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers})()
+
+
+def _chat(base_url: str) -> str:
+    import urllib.error
+    import urllib.request
+
+    body = json.dumps({"model": "llama-3.1-8b-instant", "messages": [{"role": "user", "content": "hi"}]})
+    request = urllib.request.Request(f"{base_url}/openai/v1/chat/completions", data=body.encode(),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.load(response)["choices"][0]["message"]["content"]
+    except urllib.error.HTTPError as e:
+        raise _HTTPStatusError(e.code, {k.lower(): v for k, v in e.headers.items()})
+
+
+def run_load(args) -> int:
+    server = FakeGroq(("127.0.0.1", 0), rps=args.rps, latency=args.latency, reply="I hear you.")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    dispatcher = LLMDispatcher(max_concurrency=args.max_concurrency, rate_per_second=args.dispatcher_rate,
+                               burst=args.max_concurrency, queue_timeout=args.queue_timeout,
+                               max_retries=args.max_retries, base_backoff=0.1)
+    start = time.perf_counter()
+    errors = []
+
+    def one(_):
+        try:
+            return dispatcher.invoke(_chat, base_url)
+        except Exception as e:
+            errors.append(repr(e))
+
+    with ThreadPoolExecutor(max_workers=args.callers) as pool:
+        replies = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    stats = dispatcher.stats()
+    print(json.dumps({"seconds": round(elapsed, 2), "server": {**server.counts, "peak_active": server.peak_active},
+                      "dispatcher": stats, "errors": errors[:5]}, indent=2))
+    failures = []
+    if errors or sum(r == "I hear you." for r in replies) != args.requests:
+        failures.append(f"{len(errors)} requests failed")
+    if server.peak_active > args.max_concurrency:
+        failures.append(f"server saw {server.peak_active} concurrent calls (cap {args.max_concurrency})")
+    if server.counts["rate_limited"] and not stats["retries"]:
+        failures.append("429s were not retried")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve")
+    serve.add_argument("--port", type=int, default=8099)
+    serve.add_argument("--reply", default="I hear you. That sounds really hard.")
+    load = sub.add_parser("load")
+    load.add_argument("--requests", type=int, default=40)
+    load.add_argument("--callers", type=int, default=16, help="concurrent client threads")
+    load.add_argument("--max-concurrency", type=int, default=4)
+    load.add_argument("--dispatcher-rate", type=float, default=20.0, help="dispatcher token-bucket rate (req/s)")
+    load.add_argument("--queue-timeout", type=float, default=30.0)
+    load.add_argument("--max-retries", type=int, default=8)
+    for p in (serve, load):
+        p.add_argument("--rps", type=float, default=5.0, help="server-side limit before 429 (0 = unlimited)")
+        p.add_argument("--latency", type=float, default=0.2, help="seconds per completion")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = FakeGroq(("127.0.0.1", args.port), rps=args.rps, latency=args.latency, reply=args.reply)
+        print(f"Fake Groq on http://127.0.0.1:{args.port} (rps={args.rps}, latency={args.latency}s)")
+        server.serve_forever()
+    else:
+        sys.exit(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,31 @@
-import cv2
 import logging
-from deepface import DeepFace
 from collections import Counter
-from typing import Optional
+from typing import Callable, List, Optional
+
+import tracing
 
 logger = logging.getLogger("fer_module")
 
+# cv2 and DeepFace (which pulls in TensorFlow) are imported inside the functions below so
+# importing this module stays cheap for the API server.
+
 
-def capture_emotion_from_video(duration_seconds: int = 20) -> str:
+def capture_emotion_from_video(duration_seconds: int = 20,
+                               on_vote: Optional[Callable[[Counter], None]] = None) -> str:
     """
     Captures video from webcam for specified duration and returns dominant emotion.
     
     Args:
         duration_seconds: Duration to capture video (default 5 seconds)
+        on_vote: Optional callback invoked with the running emotion Counter after every
+            analyzed frame (used to start speculative work before capture ends)
         
     Returns:
         Dominant emotion detected across the video frames
     """
+    import cv2
+    from deepface import DeepFace
+
     cap = cv2.VideoCapture(0)
     
     if not cap.isOpened():
@@ -41,14 +50,21 @@ def capture_emotion_from_video(duration_seconds: int = 20) -> str:
             # Analyze every 10th frame to improve performance
             if frame_count % 10 == 0:
                 try:
-                    result = DeepFace.analyze(
-                        frame,
-                        actions=['emotion'],
-                        enforce_detection=False
-                    )
+                    with tracing.span("fer_frame"):
+                        result = DeepFace.analyze(
+                            frame,
+                            actions=['emotion'],
+                            enforce_detection=False
+                        )
+                    tracing.metrics.inc("fer_frames_analyzed_total")
                     
                     emotion = result[0]['dominant_emotion']
                     emotions_detected.append(emotion)
+                    if on_vote is not None:
+                        try:
+                            on_vote(Counter(emotions_detected))
+                        except Exception as e:
+                            logger.warning(f"on_vote callback failed: {e}")
                     
                     # Display on frame
                     cv2.putText(
@@ -102,6 +118,15 @@ def capture_emotion_from_video(duration_seconds: int = 20) -> str:
         return "neutral"
 
 
+def load_model() -> None:
+    """Load the DeepFace emotion model so the first analyze() call doesn't pay for it."""
+    import numpy as np
+    from deepface import DeepFace
+
+    # analyzing a blank frame builds and caches the emotion model across DeepFace versions
+    DeepFace.analyze(np.zeros((48, 48, 3), dtype=np.uint8), actions=['emotion'], enforce_detection=False)
+
+
 def analyze_single_frame(frame) -> Optional[str]:
     """
     Analyzes a single frame for emotion detection.
@@ -112,18 +137,57 @@ def analyze_single_frame(frame) -> Optional[str]:
     Returns:
         Detected emotion or None if detection fails
     """
+    from deepface import DeepFace
+
     try:
-        result = DeepFace.analyze(
-            frame,
-            actions=['emotion'],
-            enforce_detection=False
-        )
+        with tracing.span("fer_frame"):
+            result = DeepFace.analyze(
+                frame,
+                actions=['emotion'],
+                enforce_detection=False
+            )
+        tracing.metrics.inc("fer_frames_analyzed_total")
         return result[0]['dominant_emotion']
     except Exception as e:
         logger.error(f"Error analyzing frame: {e}")
         return None
 
 
+def analyze_encoded_frames(frames: List[str]) -> Optional[str]:
+    """
+    Majority-vote emotion over client-captured frames (base64 JPEG/PNG, data URLs allowed).
+
+    Args:
+        frames: Base64-encoded images
+
+    Returns:
+        Dominant emotion, or None if no frame could be decoded/analyzed
+    """
+    import base64
+    import cv2
+    import numpy as np
+
+    votes = Counter()
+    for encoded in frames:
+        try:
+            raw = base64.b64decode(encoded.split(",", 1)[-1])
+            frame = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except Exception as e:
+            logger.warning(f"Skipping undecodable frame: {e}")
+            continue
+        if frame is None:
+            logger.warning("Skipping undecodable frame")
+            continue
+        emotion = analyze_single_frame(frame)
+        if emotion:
+            votes[emotion] += 1
+    if not votes:
+        return None
+    dominant = votes.most_common(1)[0][0]
+    logger.info(f"Emotion votes over {sum(votes.values())} frames: {dict(votes)}")
+    return dominant
+
+
 # For testing the module independently
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,60 @@
+"""Import-time profile for the API server modules.
+
+Runs `python -X importtime` in a fresh interpreter for each module and prints the
+slowest imports (cumulative), so cold-start regressions are easy to spot.
+
+Usage:
+    python import_profile.py                 # app + each heavy module
+    python import_profile.py fer --top 30    # a single module
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+DEFAULT_MODULES = ["app", "multimodel_therapist", "multimodel_friend", "fer"]
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_module(module: str) -> Tuple[float, List[Tuple[int, int, str]]]:
+    """Returns (wall seconds, [(self_us, cumulative_us, name), ...]) for importing `module`."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), m.group(4)))
+    return wall, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list per module")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            wall, rows = profile_module(module)
+        except RuntimeError as e:
+            print(f"\n{module}: FAILED ({e})")
+            continue
+        print(f"\n{module}: {wall:.2f}s wall")
+        print(f"  {'cumulative':>12} {'self':>10}  module")
+        for self_us, cum_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]:
+            print(f"  {cum_us / 1e6:11.3f}s {self_us / 1e6:9.3f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import json
+import logging
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from partitions import tag_text
+from prompt_builder import estimate_tokens
+
+logger = logging.getLogger("ingestion")
+
+# Bump when the document layout changes; load_faiss_index refuses indexes built with another version
+INDEX_SCHEMA_VERSION = 5
+
+# all-MiniLM-L6-v2 truncates its input at 256 word pieces; anything past that is wasted work
+EMBED_MAX_TOKENS = 256
+# Per-exemplar budget for the retrieved context sent to the LLM
+EXEMPLAR_CONTEXT_CHARS = 300
+EXEMPLAR_RESPONSE_CHARS = 600
+
+
+class FieldMapping:
+    """Which row fields are embedded and which are carried along as retrieval payload.
+
+    Rows missing `embed_field` fall back to `fallback_field`, then to the whole row as
+    JSON (the pre-mapping behaviour), so arbitrary datasets still load.
+    """
+
+    def __init__(self, embed_field: str = "Context", response_field: str = "Response",
+                 fallback_field: str = "text", max_tokens: int = EMBED_MAX_TOKENS):
+        self.embed_field = embed_field
+        self.response_field = response_field
+        self.fallback_field = fallback_field
+        self.max_tokens = max_tokens
+
+    def to_dict(self) -> dict:
+        return {"embed": self.embed_field, "response": self.response_field, "fallback": self.fallback_field,
+                "max_tokens": self.max_tokens}
+
+
+THERAPY_MAPPING = FieldMapping()
+
+
+def _clean(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` at a word boundary so it fits `max_tokens` (estimate_tokens heuristic)."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[: max_tokens * 4]
+    space = cut.rfind(" ")
+    return cut[:space] if space > 0 else cut
+
+
+def trim(text: str, max_chars: int) -> str:
+    text = _clean(text)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 else cut) + "…"
+
+
+def row_to_document(row: dict, doc_id: int, mapping: FieldMapping = THERAPY_MAPPING) -> Optional[Document]:
+    """One dataset row -> Document whose page_content is the (truncated) embed field."""
+    content = row.get(mapping.embed_field) or row.get(mapping.fallback_field)
+    if content is None:
+        content = json.dumps(row, default=str)
+    content = truncate_tokens(_clean(content), mapping.max_tokens)
+    if not content:
+        return None
+    # Tags come from the client side only; counsellor replies mention every emotion
+    metadata = {"id": doc_id, "tags": tag_text(content)}
+    response = row.get(mapping.response_field)
+    if response:
+        metadata["response"] = _clean(response)
+    return Document(page_content=content, metadata=metadata)
+
+
+def iter_documents(rows: Iterable[dict], mapping: FieldMapping = THERAPY_MAPPING) -> Iterator[Document]:
+    skipped = 0
+    for i, row in enumerate(rows):
+        doc = row_to_document(row, i, mapping)
+        if doc is None:
+            skipped += 1
+            continue
+        yield doc
+    if skipped:
+        logger.warning(f"Skipped {skipped} rows with no text in '{mapping.embed_field}'")
+
+
+def rows_to_documents(rows: Iterable[dict], mapping: FieldMapping = THERAPY_MAPPING) -> List[Document]:
+    return list(iter_documents(rows, mapping))
+
+
+# ---------- Streaming readers ----------
+READ_CHUNK_CHARS = 1 << 20
+
+
+def _iter_json_array(f, chunk_chars: int = READ_CHUNK_CHARS) -> Iterator[dict]:
+    """Yield the elements of a top-level JSON array, holding ~one chunk plus one row in memory."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        more = f.read(chunk_chars)
+        eof = not more
+        buf, pos = buf[pos:] + more, 0
+        return not eof
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip(" \t\r\n")
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("expected a top-level JSON array (use .jsonl for one object per line)")
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        try:
+            row, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof or not fill():
+                raise
+            continue
+        pos = end
+        yield row
+
+
+def iter_rows(path: str) -> Iterator[dict]:
+    """Stream dataset rows from a .jsonl file (one object per line) or a JSON array.
+
+    JSON arrays are parsed with ijson when it is installed, otherwise incrementally with
+    json.JSONDecoder.raw_decode; either way the whole file is never materialised.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+        try:
+            import ijson
+        except ImportError:
+            yield from _iter_json_array(f)
+            return
+    with open(path, "rb") as fb:
+        # floats, not Decimal, so rows serialise like the json-module paths above
+        yield from ijson.items(fb, "item", use_float=True)
+
+
+def format_exemplars(docs: Sequence[Document], context_chars: int = EXEMPLAR_CONTEXT_CHARS,
+                     response_chars: int = EXEMPLAR_RESPONSE_CHARS) -> str:
+    """Compact "Client: / Therapist:" pairs for the prompt, each side trimmed to a char budget."""
+    blocks = []
+    for doc in docs:
+        block = f"Client: {trim(doc.page_content, context_chars)}"
+        # Merged near-duplicates (compaction.py) carry several answers; show the first one
+        responses = doc.metadata.get("responses") or [doc.metadata.get("response")]
+        if responses[0]:
+            block += f"\nTherapist: {trim(responses[0], response_chars)}"
+        blocks.append(block)
+    return "\n\n".join(blocks)
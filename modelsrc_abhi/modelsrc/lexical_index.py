@@ -0,0 +1,111 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger("lexical_index")
+
+LEXICAL_FILE = "bm25.json"
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# Small English stopword list; rare terms (medications, situations) are what BM25 is for
+STOPWORDS = frozenset("""
+a about after again all am an and any are as at be because been before being but by can could did do
+does doing don't for from had has have having he her here hers him his how i i'm i've if in into is it
+it's its just me more most my myself no nor not now of off on once only or other our out over own same
+she should so some such than that the their them then there these they this those through to too under
+until up very was we were what when where which while who why will with would you your yours
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    """Okapi BM25 over the indexed texts, with a precomputed inverted index.
+
+    Postings map term -> [(doc position, term frequency)]; positions line up with the
+    FAISS index (vectorstore.index_to_docstore_id), so results can be fused by position.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.avgdl = 0.0
+
+    @classmethod
+    def build(cls, texts: Sequence[str], **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        for text in texts:
+            index.add(text)
+        return index
+
+    def add(self, text: str) -> int:
+        """Index `text` at the next position (streaming ingestion); returns that position."""
+        pos = len(self.doc_lengths)
+        tokens = tokenize(text)
+        self.doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((pos, tf))
+        self.avgdl += (len(tokens) - self.avgdl) / len(self.doc_lengths)
+        return pos
+
+    def idf(self, term: str) -> float:
+        n = len(self.doc_lengths)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """Top-k (position, score), best first. Only documents sharing a query term (and in
+        `allowed`, when given) are scored."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for pos, tf in postings:
+                if allowed is not None and pos not in allowed:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[pos] / (self.avgdl or 1))
+                scores[pos] = scores.get(pos, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+    def save(self, directory: str) -> None:
+        path = os.path.join(directory, LEXICAL_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "doc_lengths": self.doc_lengths, "postings": self.postings}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index":
+        with open(os.path.join(directory, LEXICAL_FILE), "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        index = cls(k1=stored["k1"], b=stored["b"])
+        index.doc_lengths = stored["doc_lengths"]
+        index.postings = {t: [tuple(p) for p in plist] for t, plist in stored["postings"].items()}
+        index.avgdl = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
+
+
+def is_decisive(hits: List[Tuple[int, float]], min_score: float, margin: float) -> bool:
+    """True when the lexical ranking alone is trustworthy: the top hit scores at least
+    `min_score` and beats the runner-up by a factor of `margin`."""
+    if not hits or hits[0][1] < min_score:
+        return False
+    return len(hits) == 1 or hits[0][1] >= margin * hits[1][1]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int, rrf_k: int = 60) -> List[int]:
+    """Fuse ranked position lists (best first) with RRF: score = sum 1 / (rrf_k + rank)."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, pos in enumerate(ranking):
+            scores[pos] = scores.get(pos, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return [pos for pos, _ in sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]]
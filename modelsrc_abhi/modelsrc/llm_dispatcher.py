@@ -0,0 +1,234 @@
+import os
+import random
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Optional
+
+import tracing
+
+logger = logging.getLogger("llm_dispatcher")
+
+
+class LLMQueueTimeout(RuntimeError):
+    """Raised when a request could not get a concurrency slot / rate token before its deadline."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` stored."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, deadline: float) -> bool:
+        """Blocks until a token is available or `deadline` (monotonic) passes."""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def _is_rate_limited(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMDispatcher:
+    """Central gate for every Groq call made by the API.
+
+    Applies a global concurrency cap and a token-bucket request rate, bounds how long a
+    request may wait in the queue, and retries 429 responses with jittered exponential
+    backoff (honouring Retry-After up to `max_backoff`). Queue wait times are kept for `stats()`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        rate_per_second: float = 0.5,
+        burst: int = 4,
+        queue_timeout: float = 15.0,
+        max_retries: int = 3,
+        base_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_second, burst)
+        self._lock = threading.Lock()
+        self._waits_ms = deque(maxlen=1000)
+        self._counters = {"requests": 0, "completed": 0, "failed": 0, "retries": 0,
+                          "rate_limited": 0, "queue_timeouts": 0}
+        self._waiting = 0
+        self._in_flight = 0
+
+    @classmethod
+    def from_env(cls) -> "LLMDispatcher":
+        return cls(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+            rate_per_second=float(os.getenv("LLM_RATE_PER_SECOND", "0.5")),
+            burst=int(os.getenv("LLM_BURST", "4")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "15")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        )
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += n
+
+    def _acquire(self, deadline: float) -> None:
+        with self._lock:
+            self._waiting += 1
+        start = time.monotonic()
+        try:
+            # token first: waiting on the rate limit must not hold a slot other callers could use
+            if not self._bucket.acquire(deadline):
+                raise LLMQueueTimeout("LLM rate limit: no token within deadline")
+            if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise LLMQueueTimeout("LLM concurrency limit: no slot within deadline")
+        except LLMQueueTimeout:
+            self._count("queue_timeouts")
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        waited = time.monotonic() - start
+        tracing.record("llm_queue_wait", waited)
+        with self._lock:
+            self._waits_ms.append(waited * 1000.0)
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def invoke(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` (e.g. `chain.invoke`) under the global limits.
+
+        Args:
+            fn: The blocking LLM call.
+            timeout: Max seconds to wait for a slot/token per attempt (default: queue_timeout).
+
+        Returns:
+            Whatever `fn` returns.
+        """
+        self._count("requests")
+        attempt = 0
+        while True:
+            self._acquire(time.monotonic() + (timeout if timeout is not None else self.queue_timeout))
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if _is_rate_limited(e) and attempt < self.max_retries:
+                    self._count("rate_limited")
+                    self._count("retries")
+                    backoff = random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+                    # a huge Retry-After would otherwise park the caller far past any client timeout
+                    delay = max(backoff, min(_retry_after(e) or 0.0, self.max_backoff))
+                    logger.warning(f"LLM rate limited (attempt {attempt + 1}), retrying in {delay:.2f}s")
+                    attempt += 1
+                    # back off outside the concurrency slot so other requests can proceed
+                    self._release()
+                    time.sleep(delay)
+                    continue
+                if _is_rate_limited(e):
+                    self._count("rate_limited")
+                self._count("failed")
+                self._release()
+                raise
+            self._count("completed")
+            self._release()
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            counters = dict(self._counters)
+            waiting, in_flight = self._waiting, self._in_flight
+
+        def pct(q: float) -> float:
+            return waits[min(len(waits) - 1, int(q * (len(waits) - 1)))] if waits else 0.0
+
+        return {
+            **counters,
+            "waiting": waiting,
+            "in_flight": in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queue_wait_ms": {
+                "mean": sum(waits) / len(waits) if waits else 0.0,
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+                "max": waits[-1] if waits else 0.0,
+            },
+        }
+
+
+def stream_chat(llm, messages) -> Any:
+    """Call a chat model via `llm.stream` so time-to-first-token can be traced.
+
+    Returns the merged AIMessageChunk (same `.content` / `usage_metadata` as `llm.invoke`).
+    Run it through `dispatcher.invoke` like any other LLM call.
+    """
+    start = time.perf_counter()
+    reply = None
+    for chunk in llm.stream(messages):
+        if reply is None:
+            tracing.record("llm_first_token", time.perf_counter() - start)
+            reply = chunk
+        else:
+            reply = reply + chunk
+    tracing.record("llm_total", time.perf_counter() - start)
+    if reply is None:
+        raise RuntimeError("LLM stream returned no chunks")
+    return reply
+
+
+def probe_groq(api_key: Optional[str], base_url: Optional[str] = None, timeout: float = 3.0) -> dict:
+    """Cheap reachability check: list models (no tokens spent). Raises on failure."""
+    import requests
+
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY missing")
+    url = (base_url or "https://api.groq.com").rstrip("/") + "/openai/v1/models"
+    start = time.perf_counter()
+    response = requests.get(url, headers={"Authorization": f"Bearer {api_key}"}, timeout=timeout)
+    response.raise_for_status()
+    return {"probe_ms": round((time.perf_counter() - start) * 1000.0, 1)}
+
+
+# Shared by the therapist and friend modules so the cap applies across both personas.
+dispatcher = LLMDispatcher.from_env()
@@ -1,108 +1,99 @@
 import os
-import json
 import warnings
-from typing import List
 
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+
+from llm_dispatcher import dispatcher, stream_chat
+from prompt_builder import build_friend_messages, token_stats
+import tracing
 
 # ---------- Environment & Warnings ----------
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 warnings.filterwarnings("ignore")
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Optional override, e.g. a local fake chat-completions server for load tests
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
 
 # ---------- Constants ----------
 MODEL_NAME = "llama-3.1-8b-instant"
 
-# ---------- Prompt Template ----------
-prompt_template = """
-You are "{friend_name}", the user's emotionally intelligent best friend. 
-Your primary mission is to make the user feel truly *seen*, *heard*, and *understood*. 
-You respond with warmth, empathy, humor, and authenticity — like a best friend who can handle laughter, tears, rants, and vulnerable truths.
-
-### Mode
-The user has selected the **{mode}** mode. 
-This defines your vibe and style for this conversation:
-- **Caring**: gentle, nurturing, patient, validating feelings.
-- **Chill**: casual, relaxed, "hang out" vibes, less formal.
-- **Flirty**: playful, light teasing, but respectful and supportive.
-- **Funny**: lots of humor, jokes, memes, light-hearted responses.
-- **Deep**: thoughtful, introspective, soulful conversations.
-- **Hype**: uplifting, motivational, full of positive energy.
-- **Real Talk**: brutally honest but still kind and supportive.
-
-Adapt your tone, language, and energy to match the selected mode naturally.
-
-### Facial Emotion Recognition (FER)
-Based on facial expression analysis, the user's current detected emotion is: **{fer_emotion}**
-
-Use this emotional context to:
-- Acknowledge their visible emotional state naturally (e.g., "I can see you're feeling a bit down" or "You look happy today!")
-- Match your energy and approach to their current emotional state
-- Provide more appropriate support based on what you can "see"
-- Don't over-rely on it - they might type something that contradicts their expression, and that's okay
-
-### Core Principles
-- Always sound human, warm, and approachable — not like a robot or therapist.
-- Validate emotions first before responding or giving advice.
-- Don't lecture; keep the conversation flowing like a natural chat.
-- Use occasional emojis, casual language, or humor where appropriate.
-- Ask open-ended questions to invite the user to open up.
-- Share comforting or relatable thoughts to make the user feel less alone.
-- Respect boundaries and keep it safe, supportive, and fun.
-- Don't reference your AI nature — be fully in the role of their best friend.
-
-### Conversation History
-Below is the ongoing chat between you and the user. Continue the conversation naturally, staying in character and maintaining emotional continuity.
-
-{context}
-
-User: {query}
-
-{friend_name}:
-"""
-
-prompt = PromptTemplate(
-    template=prompt_template,
-    input_variables=["query", "mode", "friend_name", "fer_emotion", "context"]
-)
-
-# ---------- Initialize LLM with LCEL ----------
-llm = ChatGroq(
-    groq_api_key=GROQ_API_KEY,
-    model_name=MODEL_NAME,
-)
-
-# Modern LCEL chain
-chain = prompt | llm | StrOutputParser()
+# Opt-in semantic cache for recurring first-turn messages ("hey", "good morning", ...)
+FRIEND_CACHE_ENABLED = os.getenv("FRIEND_CACHE_ENABLED", "0") == "1"
+FRIEND_CACHE_THRESHOLD = float(os.getenv("FRIEND_CACHE_THRESHOLD", "0.92"))
+FRIEND_CACHE_MAX_ENTRIES = int(os.getenv("FRIEND_CACHE_MAX_ENTRIES", "512"))
+FRIEND_CACHE_TTL_SECONDS = float(os.getenv("FRIEND_CACHE_TTL_SECONDS", "21600"))
+FRIEND_CACHE_VARIANTS = int(os.getenv("FRIEND_CACHE_VARIANTS", "3"))
+
+# ---------- Prompt ----------
+# The static persona/mode instructions are pre-rendered once per (friend_name, mode) into a
+# system message by prompt_builder; only FER emotion, history and the query vary per call.
 
 # ---------- FastAPI Integration Helper ----------
-_FRIEND_CHAIN = chain if GROQ_API_KEY else None
+_FRIEND_LLM = None
 
-def _ensure_friend_chain():
-    """Lazy-initialize and cache the friend chain.
+def _ensure_friend_llm():
+    """Lazy-initialize and cache the friend chat model.
 
     This avoids re-creating the model on every request.
     """
-    global _FRIEND_CHAIN
-    if _FRIEND_CHAIN is not None:
-        return _FRIEND_CHAIN
+    global _FRIEND_LLM
+    if _FRIEND_LLM is not None:
+        return _FRIEND_LLM
 
     if not GROQ_API_KEY:
         raise RuntimeError("GROQ_API_KEY missing. Set it in environment or .env")
 
-    friend_llm = ChatGroq(
+    from langchain_groq import ChatGroq
+
+    _FRIEND_LLM = ChatGroq(
         groq_api_key=GROQ_API_KEY,
         model_name=MODEL_NAME,
+        base_url=GROQ_BASE_URL,
+        max_retries=0,  # 429 retries are handled by llm_dispatcher
     )
-    _FRIEND_CHAIN = prompt | friend_llm | StrOutputParser()
-    return _FRIEND_CHAIN
+    return _FRIEND_LLM
+
+
+def generate_friend_reply(query: str, mode: str, friend_name: str, fer_emotion: str = "neutral",
+                          context: str = "") -> str:
+    """Single LLM round-trip with the compiled friend prompt; records token counts."""
+    with tracing.span("render_prompt"):
+        messages = build_friend_messages(query, mode, friend_name, fer_emotion, context)
+    reply = dispatcher.invoke(stream_chat, _ensure_friend_llm(), messages)
+    token_stats.record("friend", messages, reply)
+    return reply.content
+
 
+_RESPONSE_CACHE = None
 
-def get_friend_response(query: str, mode: str, friend_name: str, fer_emotion: str = "neutral") -> str:
+def get_response_cache():
+    """Lazy-initialize the semantic reply cache (None when FRIEND_CACHE_ENABLED is off)."""
+    global _RESPONSE_CACHE
+    if not FRIEND_CACHE_ENABLED:
+        return None
+    if _RESPONSE_CACHE is None:
+        from multimodel_therapist import get_embeddings
+        from response_cache import SemanticResponseCache
+
+        # same MiniLM model as the therapist index; share the loaded instance
+        embeddings = get_embeddings()
+        _RESPONSE_CACHE = SemanticResponseCache(
+            embed_fn=embeddings.embed_documents,
+            threshold=FRIEND_CACHE_THRESHOLD,
+            max_entries=FRIEND_CACHE_MAX_ENTRIES,
+            ttl_seconds=FRIEND_CACHE_TTL_SECONDS,
+            max_variants=FRIEND_CACHE_VARIANTS,
+        )
+    return _RESPONSE_CACHE
+
+
+def _cache_bucket(mode: str, friend_name: str, fer_emotion: str) -> tuple:
+    return mode.strip().lower(), (fer_emotion or "neutral").strip().lower(), friend_name.strip().lower()
+
+
+def get_friend_response(query: str, mode: str, friend_name: str, fer_emotion: str = "neutral",
+                        store: bool = True) -> str:
     """Public function used by the FastAPI app to get a best-friend style response.
 
     Args:
@@ -110,19 +101,32 @@ def get_friend_response(query: str, mode: str, friend_name: str, fer_emotion: st
         mode: Conversation mode determining tone/style.
         friend_name: Persona name of the AI friend.
         fer_emotion: Detected emotion from facial expression recognition (default: "neutral")
+        store: Add a fresh reply to the semantic cache. Speculative callers pass False and
+            call `store_friend_reply` for the reply they actually return.
 
     Returns:
         The model-generated friend response as a string.
     """
-    friend_chain = _ensure_friend_chain()
-
-    return friend_chain.invoke({
-        "query": query,
-        "mode": mode,
-        "friend_name": friend_name,
-        "fer_emotion": fer_emotion,
-        "context": "",
-    })
+    cache = get_response_cache()
+    bucket = _cache_bucket(mode, friend_name, fer_emotion)
+    if cache is not None:
+        with tracing.span("cache_lookup"):
+            cached = cache.lookup(bucket, query)
+        if cached is not None:
+            tracing.metrics.inc("friend_cache_hits_total")
+            return cached
+
+    reply = generate_friend_reply(query, mode, friend_name, fer_emotion)
+    if cache is not None and store:
+        cache.store(bucket, query, reply)
+    return reply
+
+
+def store_friend_reply(query: str, mode: str, friend_name: str, fer_emotion: str, reply: str) -> None:
+    """Cache a reply produced with get_friend_response(..., store=False)."""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.store(_cache_bucket(mode, friend_name, fer_emotion), query, reply)
 
 # ---------- Main CLI ----------
 def main():
@@ -167,13 +171,7 @@ def main():
             break
 
         try:
-            reply = chain.invoke({
-                "query": user_input,
-                "mode": mode,
-                "friend_name": friend_name,
-                "fer_emotion": fer_emotion,
-                "context": context
-            })
+            reply = generate_friend_reply(user_input, mode, friend_name, fer_emotion, context)
         except Exception as e:
             print(f"⚠️ Error from model: {e}")
             continue
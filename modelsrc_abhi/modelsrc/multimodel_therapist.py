@@ -2,27 +2,38 @@
 
 import os
 import json
+import logging
+import threading
+import time
 import warnings
-from typing import List
+from typing import List, Optional
 
 from dotenv import load_dotenv
 
 # LangChain imports - MODERN LCEL
-from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+# Heavy stacks (Groq client, HuggingFace/torch, FAISS) are imported on first use so the
+# API process can start serving /health before they are loaded.
 from langchain_core.documents import Document
 
-# Speech
-import pyttsx3
+from compaction import StreamingCompactor, compact_documents
+from ingestion import (INDEX_SCHEMA_VERSION, THERAPY_MAPPING, FieldMapping, format_exemplars, iter_documents,
+                       iter_rows, rows_to_documents)
+from llm_dispatcher import dispatcher, stream_chat
+from prompt_builder import build_therapist_messages, token_stats
+from lexical_index import LEXICAL_FILE, BM25Index, is_decisive, reciprocal_rank_fusion
+import tracing
+from partitions import TagPartitions, tags_for_state
+from vector_index import INDEX_TYPE, apply_search_params, empty_trained_index, resolve_spec, search_params
+
+logger = logging.getLogger("multimodel_therapist")
 
 # ---------- Environment & Warnings ----------
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 warnings.filterwarnings("ignore")
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Optional override, e.g. a local fake chat-completions server for load tests
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
 
 # ---------- Constants ----------
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
@@ -30,95 +41,399 @@ EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "combined_dataset_fixed.json")
 FAISS_INDEX_PATH = os.path.join(BASE_DIR, "faiss_index")
+DOCSTORE_FILE = "docstore.json"
+# Near-duplicate contexts at or above this MinHash Jaccard estimate share one vector (0 disables)
+COMPACT_THRESHOLD = float(os.getenv("FAISS_COMPACT_THRESHOLD", "0.8"))
 MODEL_NAME = "llama-3.1-8b-instant"
+RETRIEVAL_K = 3
+# "hybrid": BM25 + FAISS fused with reciprocal rank fusion (lexical-only when BM25 is decisive);
+# "dense": FAISS only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "10"))
+# BM25 answers alone when its top hit scores >= LEXICAL_MIN_SCORE and beats the runner-up by LEXICAL_MARGIN x
+LEXICAL_MIN_SCORE = float(os.getenv("LEXICAL_MIN_SCORE", "8.0"))
+LEXICAL_MARGIN = float(os.getenv("LEXICAL_MARGIN", "1.5"))
+# Restrict retrieval to the tag shard selected by mood/fer_mood/stress/fatigue (see partitions.py)
+PARTITIONED_RETRIEVAL = os.getenv("PARTITIONED_RETRIEVAL", "1") == "1"
+# Ingestion: "auto" streams JSONL files and JSON files above INGEST_STREAMING_MIN_BYTES; "1"/"0" force it
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "auto")
+INGEST_STREAMING_MIN_BYTES = int(os.getenv("INGEST_STREAMING_MIN_BYTES", str(200 * 1024 * 1024)))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# Vectors buffered to train IVF/PQ/SQ8 before streaming the rest; nlist is sized for
+# INGEST_EXPECTED_ROWS when given, else for the sample
+INGEST_TRAIN_SAMPLE = int(os.getenv("INGEST_TRAIN_SAMPLE", "20000"))
+INGEST_EXPECTED_ROWS = int(os.getenv("INGEST_EXPECTED_ROWS", "0"))
+INGEST_LOG_SECONDS = 10.0
 
 # ---------- Prompt ----------
-prompt_template = """
-You are "Sunny", a compassionate, empathetic, and non-judgmental virtual therapist.
-Treat the dialogue as a real, human-like therapy session.
-
-You receive sensor and facial data that reflect the user's emotional and physical state. 
-Use this data to gently acknowledge their condition before proceeding to your response.
-
-Context from similar past sessions:
-{context}
+# Static instructions live in prompt_builder.THERAPIST_SYSTEM_PROMPT (sent as the system
+# message); only retrieved context, parameters and the query are rendered per request.
 
-User emotional and physiological parameters:
-{parameters}
+# ---------- Data & Index Utilities ----------
+def load_json_data(filepath: str, mapping: FieldMapping = THERAPY_MAPPING) -> List[Document]:
+    """Rows -> Documents: embed only the client-side Context, keep Response as metadata."""
+    with open(filepath, "r") as f:
+        data = json.load(f)
+    return rows_to_documents(data, mapping)
 
-User message:
-{query}
 
-Sunny:
-1. Begin by empathetically acknowledging the user's current state based on their parameters (mood, stress, fatigue, and recovery).
-   - For example:
-     - If mood = sad and stress is high → "I can sense you're feeling low and a bit stressed right now."
-     - If fatigue is high but recovery is improving → "It seems you've been tired lately, but you're slowly getting back on track."
-   - Keep it natural and warm — not robotic.
+# Lazy singletons below are guarded by one lock each (double-checked): the readiness
+# warm-up and early requests may call the getters concurrently, and a second
+# build_from_data would race on the same index files.
+_EMBEDDINGS = None
+_EMBEDDINGS_LOCK = threading.Lock()
 
-2. Then, interpret and respond to the user's message ({query}) thoughtfully and conversationally.
-   - Offer emotional validation.
-   - Ask gentle, open-ended questions if appropriate.
-   - Provide coping suggestions or reflections related to their context.
+def get_embeddings():
+    """Shared MiniLM embedder (also used by the friend reply cache)."""
+    global _EMBEDDINGS
+    if _EMBEDDINGS is None:
+        with _EMBEDDINGS_LOCK:
+            if _EMBEDDINGS is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
 
-3. Keep the tone warm, conversational, and human-like — like a supportive therapist who genuinely cares.
-"""
+                _EMBEDDINGS = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    return _EMBEDDINGS
 
 
-prompt = PromptTemplate(
-    template=prompt_template,
-    input_variables=["context", "query", "parameters"]
-)
+def build_faiss_index(docs: List[Document]):
+    from langchain_community.vectorstores import FAISS
+
+    report = None
+    if COMPACT_THRESHOLD > 0:
+        docs, report = compact_documents(docs, threshold=COMPACT_THRESHOLD)
+    embeddings = get_embeddings()
+    texts = [d.page_content for d in docs]
+    vectors = embeddings.embed_documents(texts)
+    spec = resolve_spec(INDEX_TYPE, len(vectors), len(vectors[0]))
+    if spec == "Flat":
+        vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings,
+                                            metadatas=[d.metadata for d in docs])
+    else:
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=empty_trained_index(vectors, spec),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+        vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=[d.metadata for d in docs])
+    logger.info(f"Built FAISS index '{spec}' with {vectorstore.index.ntotal} vectors")
+    save_faiss_index(vectorstore, compaction=report, index_type=INDEX_TYPE)
+    return vectorstore
 
-# ---------- Data & Index Utilities ----------
-def load_json_data(filepath: str) -> List[Document]:
-    with open(filepath, "r") as f:
-        data = json.load(f)
-    docs: List[Document] = []
-    for i, row in enumerate(data):
-        content = row.get("text", json.dumps(row))
-        docs.append(Document(page_content=content, metadata={"id": i}))
-    return docs
 
+def build_faiss_index_streaming(data_path: str = DATA_PATH, batch_size: int = EMBED_BATCH_SIZE,
+                                path: str = FAISS_INDEX_PATH):
+    """One-pass build for corpora too large to hold as Python objects.
 
-def build_faiss_index(docs: List[Document]):
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    vectorstore.save_local(FAISS_INDEX_PATH)
-    return vectorstore
+    Rows are parsed incrementally (ingestion.iter_rows), de-duplicated online
+    (compaction.StreamingCompactor), embedded `batch_size` at a time and added to the FAISS
+    index as they go; documents are spooled to disk and the docstore JSON is assembled
+    from the spool at the end. Peak memory is the index itself plus one batch, the
+    training sample (trainable index types), the BM25 postings and, unless
+    FAISS_COMPACT_THRESHOLD=0, the compactor's ~2 KB per kept document. Writes the same
+    files as save_faiss_index under `path` and returns a build report rather than the
+    vector store: loading it (load_faiss_index) reads the whole docstore into memory.
+    """
+    import faiss
+    import numpy as np
+
+    embeddings = get_embeddings()
+    compactor = (StreamingCompactor(COMPACT_THRESHOLD, capacity=max(INGEST_EXPECTED_ROWS, 1024))
+                 if COMPACT_THRESHOLD > 0 else None)
+    lexical = BM25Index()
+    os.makedirs(path, exist_ok=True)
+    spool_path = os.path.join(path, "docs.jsonl.tmp")
+    state = {"index": None, "spec": None, "sample": [], "sampled": 0}
+
+    def add_vectors(vectors, final: bool = False) -> None:
+        if state["index"] is not None:
+            if len(vectors):
+                state["index"].add(vectors)
+            return
+        # Buffer a training sample first (IVF/PQ/SQ8 need one; harmless for flat/HNSW)
+        if len(vectors):
+            state["sample"].append(vectors)
+            state["sampled"] += len(vectors)
+        if state["sampled"] < INGEST_TRAIN_SAMPLE and not final or not state["sampled"]:
+            return
+        sample = np.concatenate(state["sample"])
+        state["spec"] = resolve_spec(INDEX_TYPE, INGEST_EXPECTED_ROWS or len(sample), sample.shape[1])
+        state["index"] = empty_trained_index(sample, state["spec"])
+        state["index"].add(sample)
+        state["sample"] = []
+
+    start = time.perf_counter()
+    last_log = start
+    rows, position, batch = 0, 0, []
+    with open(spool_path, "w", encoding="utf-8") as spool:
+        for doc in iter_documents(iter_rows(data_path)):
+            rows += 1
+            if compactor is not None and compactor.add(doc, position) != position:
+                continue
+            spool.write(json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}) + "\n")
+            lexical.add(doc.page_content)
+            batch.append(doc.page_content)
+            position += 1
+            if len(batch) >= batch_size:
+                add_vectors(np.asarray(embeddings.embed_documents(batch), dtype="float32"))
+                batch = []
+                now = time.perf_counter()
+                if now - last_log >= INGEST_LOG_SECONDS:
+                    last_log = now
+                    logger.info(f"Ingested {rows} rows -> {position} vectors "
+                                f"({rows / (now - start):.0f} rows/s, {position / (now - start):.0f} vectors/s)")
+        if batch:
+            add_vectors(np.asarray(embeddings.embed_documents(batch), dtype="float32"))
+    add_vectors(np.zeros((0, 0), dtype="float32"), final=True)
+    if state["index"] is None:
+        os.remove(spool_path)
+        raise RuntimeError(f"No documents ingested from {data_path}")
+
+    faiss.write_index(state["index"], os.path.join(path, "index.faiss"))
+    lexical.save(path)
+    report = compactor.report() if compactor is not None else None
+    # The docstore is written last: load_faiss_index treats it as the marker of a complete build
+    tmp_path = os.path.join(path, DOCSTORE_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as out, open(spool_path, "r", encoding="utf-8") as spool:
+        header = {"schema_version": INDEX_SCHEMA_VERSION, "fields": THERAPY_MAPPING.to_dict(),
+                  "compaction": report, "index_type": INDEX_TYPE}
+        out.write(json.dumps(header)[:-1] + ', "index_to_docstore_id": [')
+        out.write(", ".join(json.dumps(f"doc-{i}") for i in range(position)))
+        out.write('], "docs": {')
+        for i, line in enumerate(spool):
+            entry = json.loads(line)
+            if compactor is not None:
+                entry["metadata"] = compactor.apply(i, entry["metadata"])
+            out.write(("," if i else "") + json.dumps(f"doc-{i}") + ":" + json.dumps(entry))
+        out.write("}}")
+    os.replace(tmp_path, os.path.join(path, DOCSTORE_FILE))
+    os.remove(spool_path)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Streaming build done: {rows} rows -> {position} vectors ('{state['spec']}') in {elapsed:.1f}s "
+                f"({rows / elapsed:.0f} rows/s); compaction: {report}")
+    return {"path": path, "rows": rows, "vectors": position, "index_spec": state["spec"],
+            "seconds": round(elapsed, 1), "compaction": report}
+
+
+def use_streaming(data_path: str) -> bool:
+    """Whether build_from_data takes the streaming path (INGEST_STREAMING, JSONL or a large file)."""
+    return INGEST_STREAMING == "1" or (
+        INGEST_STREAMING == "auto"
+        and (data_path.endswith(".jsonl") or os.path.getsize(data_path) >= INGEST_STREAMING_MIN_BYTES)
+    )
 
 
-def load_faiss_index():
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    return FAISS.load_local(FAISS_INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+def build_from_data(data_path: str = DATA_PATH):
+    """(Re)build the index from the dataset, streaming for JSONL or large files."""
+    if use_streaming(data_path):
+        build_faiss_index_streaming(data_path)
+        return load_faiss_index()
+    return build_faiss_index(load_json_data(data_path))
+
+
+def save_faiss_index(vectorstore, path: str = FAISS_INDEX_PATH, compaction: Optional[dict] = None,
+                     index_type: str = INDEX_TYPE):
+    """Persist the raw FAISS index plus a JSON docstore (no pickle, unlike save_local)."""
+    import faiss
+
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(path, "index.faiss"))
+    docstore = {
+        "schema_version": INDEX_SCHEMA_VERSION,
+        "fields": THERAPY_MAPPING.to_dict(),
+        "compaction": compaction,
+        "index_type": index_type,
+        "index_to_docstore_id": [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)],
+        "docs": {
+            doc_id: {"page_content": doc.page_content, "metadata": doc.metadata}
+            for doc_id, doc in vectorstore.docstore._dict.items()
+        },
+    }
+    tmp_path = os.path.join(path, DOCSTORE_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(docstore, f)
+    os.replace(tmp_path, os.path.join(path, DOCSTORE_FILE))
+    # BM25 postings are keyed by FAISS position, so they are rebuilt with every index write
+    build_lexical_index(vectorstore).save(path)
+
+
+def _doc_at(vectorstore, position: int) -> Document:
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+
+
+def build_lexical_index(vectorstore) -> BM25Index:
+    texts = [_doc_at(vectorstore, i).page_content for i in range(vectorstore.index.ntotal)]
+    return BM25Index.build(texts)
+
+
+_LEXICAL_INDEX = None
+_LEXICAL_INDEX_LOCK = threading.Lock()
+
+def get_lexical_index() -> BM25Index:
+    """Load (or build from the vector store) and cache the BM25 index."""
+    global _LEXICAL_INDEX
+    if _LEXICAL_INDEX is None:
+        vectorstore = get_vectorstore()
+        with _LEXICAL_INDEX_LOCK:
+            if _LEXICAL_INDEX is None:
+                index = None
+                if os.path.exists(os.path.join(FAISS_INDEX_PATH, LEXICAL_FILE)):
+                    index = BM25Index.load(FAISS_INDEX_PATH)
+                if index is None or len(index.doc_lengths) != vectorstore.index.ntotal:
+                    index = build_lexical_index(vectorstore)
+                    index.save(FAISS_INDEX_PATH)
+                _LEXICAL_INDEX = index
+    return _LEXICAL_INDEX
+
+
+_PARTITIONS = None
+_PARTITIONS_LOCK = threading.Lock()
+
+def get_partitions() -> TagPartitions:
+    """Per-tag position bitmaps over the current vector store (built once, from doc metadata)."""
+    global _PARTITIONS
+    if _PARTITIONS is None:
+        vectorstore = get_vectorstore()
+        with _PARTITIONS_LOCK:
+            if _PARTITIONS is None:
+                n = vectorstore.index.ntotal
+                partitions = TagPartitions(n, [_doc_at(vectorstore, i).metadata.get("tags", ()) for i in range(n)])
+                logger.info(f"Tag partitions: {partitions.sizes()}")
+                _PARTITIONS = partitions
+    return _PARTITIONS
+
+
+def load_faiss_index(path: str = FAISS_INDEX_PATH):
+    """Vector store saved under `path`; the whole docstore JSON is held in memory (InMemoryDocstore)."""
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = get_embeddings()
+    docstore_path = os.path.join(path, DOCSTORE_FILE)
+    if not os.path.exists(docstore_path):
+        if os.path.exists(DATA_PATH):
+            # Legacy pickled index embedded whole JSON rows; rebuild with the field mapping
+            logger.info(f"Legacy FAISS index found, rebuilding with schema v{INDEX_SCHEMA_VERSION}")
+            return build_from_data(DATA_PATH)
+        # No source data to rebuild from: load once, then migrate to JSON as-is
+        vectorstore = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        save_faiss_index(vectorstore, path)
+        return vectorstore
+
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    with open(docstore_path, "r", encoding="utf-8") as f:
+        stored = json.load(f)
+    # Never rebuild implicitly here: DATA_PATH may not be the corpus this index was built from
+    if stored.get("schema_version") != INDEX_SCHEMA_VERSION:
+        raise RuntimeError(
+            f"FAISS index at {path} has schema v{stored.get('schema_version')}, this code expects "
+            f"v{INDEX_SCHEMA_VERSION}; rebuild it with `python build_index.py <corpus>`"
+        )
+    stored_type = stored.get("index_type", "flat")
+    if stored_type != INDEX_TYPE:
+        logger.warning(f"FAISS index at {path} was built as '{stored_type}' but FAISS_INDEX_TYPE is "
+                       f"'{INDEX_TYPE}'; serving the stored '{stored_type}' index (rebuild to change it)")
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    apply_search_params(index)
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=d["page_content"], metadata=d["metadata"])
+        for doc_id, d in stored["docs"].items()
+    })
+    index_to_docstore_id = dict(enumerate(stored["index_to_docstore_id"]))
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
 
 
 # ---------- LLM + Retrieval with LCEL ----------
 def get_custom_chain(vectorstore):
+    from langchain_groq import ChatGroq
+
     llm = ChatGroq(
         groq_api_key=GROQ_API_KEY,
         model_name=MODEL_NAME,
+        base_url=GROQ_BASE_URL,
+        max_retries=0,  # 429 retries are handled by llm_dispatcher
     )
     
-    # Modern LCEL chain
-    chain = prompt | llm | StrOutputParser()
+    def dense_positions(query: str, k: int, selector=None) -> List[int]:
+        import numpy as np
+
+        with tracing.span("embed_query"):
+            embedding = get_embeddings().embed_query(query)
+        with tracing.span("faiss_search"):
+            params = search_params(vectorstore.index, selector) if selector is not None else None
+            _, found = vectorstore.index.search(np.asarray([embedding], dtype="float32"), k, params=params)
+        return [int(p) for p in found[0] if p >= 0]
+
+    def ranked_positions(query: str, shard) -> List[int]:
+        allowed, selector = shard if shard else (None, None)
+        if RETRIEVAL_MODE == "dense":
+            return dense_positions(query, RETRIEVAL_K, selector)
+        lexical = get_lexical_index()
+        with tracing.span("bm25_search"):
+            hits = lexical.search(query, HYBRID_FETCH_K, allowed=allowed)
+        if is_decisive(hits, LEXICAL_MIN_SCORE, LEXICAL_MARGIN):
+            # Strong keyword match: skip the embedding model and FAISS entirely
+            tracing.metrics.inc("retrieval_lexical_only_total")
+            return [pos for pos, _ in hits[:RETRIEVAL_K]]
+        tracing.metrics.inc("retrieval_hybrid_total")
+        dense = dense_positions(query, HYBRID_FETCH_K, selector)
+        return reciprocal_rank_fusion([dense, [pos for pos, _ in hits]], RETRIEVAL_K)
+
+    def retrieve(query: str, parameters: Optional[dict] = None) -> str:
+        # Search only the shard matching the user's state (mood / fer_mood / stress / fatigue)
+        shard = get_partitions().shard(tags_for_state(parameters)) if PARTITIONED_RETRIEVAL else None
+        positions = ranked_positions(query, shard)
+        if shard and len(positions) < RETRIEVAL_K:
+            tracing.metrics.inc("retrieval_shard_fallback_total")
+            positions = ranked_positions(query, None)
+        elif shard:
+            tracing.metrics.inc("retrieval_shard_total")
+        docs = [_doc_at(vectorstore, pos) for pos in positions]
+        # Compact Client/Therapist exemplars instead of raw documents keeps the prompt small
+        return format_exemplars(docs)
+
+    def generate(query: str, parameters: dict, context: str) -> str:
+        with tracing.span("render_prompt"):
+            messages = build_therapist_messages(query, parameters, context)
+        reply = dispatcher.invoke(stream_chat, llm, messages)
+        token_stats.record("therapist", messages, reply)
+        return reply.content
 
     def run(query: str, parameters: dict, context: str):
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-        docs = retriever.invoke(query)
-        retrieved_context = "\n\n".join([d.page_content for d in docs])
-        
-        return chain.invoke({
-            "query": query,
-            "parameters": json.dumps(parameters),
-            "context": retrieved_context or context
-        })
+        return generate(query, parameters, retrieve(query, parameters) or context)
 
+    # Exposed separately so callers can overlap retrieval with other work (see /session)
+    run.retrieve = retrieve
+    run.generate = generate
     return run
 
 
 # ---------- FastAPI Integration Helper ----------
 _THERAPIST_CHAIN = None
+_THERAPIST_CHAIN_LOCK = threading.Lock()
+_VECTORSTORE = None
+_VECTORSTORE_LOCK = threading.Lock()
+
+def get_vectorstore():
+    """Load (or build on first run) and cache the FAISS vector store."""
+    global _VECTORSTORE
+    if _VECTORSTORE is None:
+        with _VECTORSTORE_LOCK:
+            if _VECTORSTORE is None:
+                if os.path.exists(FAISS_INDEX_PATH):
+                    _VECTORSTORE = load_faiss_index()
+                else:
+                    _VECTORSTORE = build_from_data(DATA_PATH)
+    return _VECTORSTORE
 
 def _ensure_chain():
     """Lazy-initialize and cache the therapist chain with FAISS retriever.
@@ -132,13 +447,10 @@ def _ensure_chain():
     if not GROQ_API_KEY:
         raise RuntimeError("GROQ_API_KEY missing. Set it in environment or .env")
 
-    if os.path.exists(FAISS_INDEX_PATH):
-        vs = load_faiss_index()
-    else:
-        docs = load_json_data(DATA_PATH)
-        vs = build_faiss_index(docs)
-
-    _THERAPIST_CHAIN = get_custom_chain(vs)
+    vectorstore = get_vectorstore()
+    with _THERAPIST_CHAIN_LOCK:
+        if _THERAPIST_CHAIN is None:
+            _THERAPIST_CHAIN = get_custom_chain(vectorstore)
     return _THERAPIST_CHAIN
 
 
@@ -158,7 +470,15 @@ def get_therapist_response(query: str, stress: float, mood: str, fatigue: float,
     """
     chain = _ensure_chain()
 
-    parameters = {
+    parameters = therapist_parameters(stress, mood, fatigue, recovery, fer_mood)
+
+    # Context can be replaced with conversation history if available
+    context = "[]"
+    return chain(query, parameters, context)
+
+
+def therapist_parameters(stress: float, mood: str, fatigue: float, recovery: float, fer_mood: str) -> dict:
+    return {
         "mood": mood,
         "fatigue": float(fatigue),
         "recovery": float(recovery),
@@ -166,9 +486,18 @@ def get_therapist_response(query: str, stress: float, mood: str, fatigue: float,
         "fer_mood": fer_mood,
     }
 
-    # Context can be replaced with conversation history if available
-    context = "[]"
-    return chain(query, parameters, context)
+
+def retrieve_therapist_context(query: str, parameters: Optional[dict] = None) -> str:
+    """Retrieval half of get_therapist_response: top-k similar past sessions as prompt context.
+
+    `parameters` (see therapist_parameters) selects the mood/stress shard to search.
+    """
+    return _ensure_chain().retrieve(query, parameters)
+
+
+def generate_therapist_reply(query: str, parameters: dict, context: str) -> str:
+    """LLM half of get_therapist_response, given already-retrieved context."""
+    return _ensure_chain().generate(query, parameters, context or "[]")
 
 
 # ---------- Main CLI ----------
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("music_recommender")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Bundled list shipped with the app; used until the catalogue has been synced once
+MUSIC_LIST_PATH = os.getenv("MUSIC_LIST_PATH", os.path.join(BASE_DIR, "..", "..", "mindfm_music_list.json"))
+
+# Category affinities per emotion (FER labels plus common self-reported moods); categories
+# match the app's MindFM screens (focus, meditation, sleep, relax, work, nature, yoga, study)
+MOOD_CATEGORY_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "happy": {"focus": 1.0, "work": 0.9, "study": 0.8, "nature": 0.5},
+    "neutral": {"focus": 1.0, "study": 0.8, "work": 0.7, "relax": 0.5},
+    "surprise": {"focus": 0.8, "nature": 0.7, "relax": 0.6},
+    "sad": {"relax": 1.0, "nature": 0.9, "meditation": 0.8, "yoga": 0.5},
+    "angry": {"meditation": 1.0, "relax": 0.9, "yoga": 0.8, "nature": 0.6},
+    "disgust": {"meditation": 0.9, "nature": 0.8, "relax": 0.7},
+    "fear": {"meditation": 1.0, "relax": 0.9, "sleep": 0.6},
+    "anxious": {"meditation": 1.0, "relax": 0.9, "yoga": 0.6},
+    "stressed": {"meditation": 1.0, "relax": 0.9, "yoga": 0.7},
+    "tired": {"sleep": 1.0, "relax": 0.8, "meditation": 0.6},
+}
+MOOD_ALIASES = {"fearful": "fear", "anxiety": "anxious", "calm": "neutral", "depressed": "sad"}
+# Extra weight per level bucket ("high" stress / fatigue), added on top of the mood's weights
+STRESS_BOOST = {"high": {"meditation": 0.6, "relax": 0.5, "yoga": 0.3, "work": -0.4}, "mid": {"meditation": 0.2}}
+FATIGUE_BOOST = {"high": {"sleep": 0.8, "relax": 0.4, "focus": -0.5, "work": -0.5}, "mid": {"relax": 0.2}}
+# Track-name keywords count as weaker evidence for a category (catalogue folders are coarse)
+NAME_KEYWORDS = {
+    "sleep": ("sleep", "night", "dream"),
+    "relax": ("relax", "calm", "chill"),
+    "meditation": ("meditat", "mindful", "breath"),
+    "focus": ("focus", "concentrat", "pomodoro", "deep work"),
+    "work": ("productiv", "work"),
+    "study": ("study", "learn"),
+    "nature": ("rain", "forest", "ocean", "nature"),
+}
+NAME_KEYWORD_WEIGHT = 0.5
+RECOMMEND_CACHE_SIZE = 512
+
+
+def level_bucket(value: Optional[float]) -> str:
+    """0-1 sensor level -> low / mid / high (same scale as the /therapist request)."""
+    if value is None:
+        return "low"
+    return "high" if value >= 0.7 else "mid" if value >= 0.4 else "low"
+
+
+def mood_bucket(fer_mood: Optional[str], mood: Optional[str], stress: Optional[float],
+                fatigue: Optional[float]) -> Tuple[str, str, str]:
+    """The cache key: (emotion, stress level, fatigue level). FER wins over self-report."""
+    for label in (fer_mood, mood):
+        key = MOOD_ALIASES.get((label or "").strip().lower(), (label or "").strip().lower())
+        if key in MOOD_CATEGORY_WEIGHTS:
+            return key, level_bucket(stress), level_bucket(fatigue)
+    return "neutral", level_bucket(stress), level_bucket(fatigue)
+
+
+def category_weights(bucket: Tuple[str, str, str]) -> Dict[str, float]:
+    emotion, stress, fatigue = bucket
+    weights = dict(MOOD_CATEGORY_WEIGHTS[emotion])
+    for boosts, level in ((STRESS_BOOST, stress), (FATIGUE_BOOST, fatigue)):
+        for category, delta in boosts.get(level, {}).items():
+            weights[category] = weights.get(category, 0.0) + delta
+    return {c: round(w, 3) for c, w in sorted(weights.items(), key=lambda kv: kv[1], reverse=True) if w > 0}
+
+
+class TrackIndex:
+    """Precomputed per-category view of the catalogue: each track's category affinity
+    vector (its folder category plus name-keyword hints), built once per catalogue version.
+
+    `version` identifies the track list (catalogue version, or the bundled file's mtime) and
+    keys the recommendation cache; `catalogue_version` is the catalogue version seen when
+    the index was built.
+    """
+
+    def __init__(self, tracks: List[dict], version, catalogue_version=None):
+        self.version = version
+        self.catalogue_version = catalogue_version
+        self.tracks = tracks
+        self.affinities: List[Dict[str, float]] = []
+        self.by_category: Dict[str, List[int]] = {}
+        for i, track in enumerate(tracks):
+            affinity = {track["category"].lower(): 1.0}
+            name = track["name"].lower()
+            for category, words in NAME_KEYWORDS.items():
+                if category not in affinity and any(w in name for w in words):
+                    affinity[category] = NAME_KEYWORD_WEIGHT
+            self.affinities.append(affinity)
+            for category in affinity:
+                self.by_category.setdefault(category, []).append(i)
+
+    def rank(self, weights: Dict[str, float], limit: int, salt: str) -> List[dict]:
+        # Only tracks touching a wanted category are scored
+        candidates = {i for c in weights for i in self.by_category.get(c, ())}
+        scored = []
+        for i in candidates:
+            score = sum(weights.get(c, 0.0) * a for c, a in self.affinities[i].items())
+            # deterministic per-bucket tie-break so equal scores don't always favour the newest track
+            tie = hashlib.blake2b(f"{salt}|{self.tracks[i]['url']}".encode(), digest_size=4).hexdigest()
+            scored.append((-score, tie, i))
+        scored.sort()
+        return [{**self.tracks[i], "score": round(-neg, 3)} for neg, _, i in scored[:limit]]
+
+
+def _bundled_version() -> str:
+    return f"bundled-{os.path.getmtime(MUSIC_LIST_PATH)}"
+
+
+class MusicRecommender:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[TrackIndex] = None
+        self._cache: Dict[tuple, dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _load_tracks(self) -> Tuple[List[dict], object]:
+        from music_catalogue import get_catalogue
+
+        catalogue = get_catalogue()
+        tracks = catalogue.all_tracks()
+        if tracks:
+            return tracks, catalogue.version
+        version = _bundled_version()
+        with open(MUSIC_LIST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f), version
+
+    def index(self) -> TrackIndex:
+        from music_catalogue import get_catalogue
+
+        catalogue_version = get_catalogue().version
+        with self._lock:
+            current = self._index
+        # While the catalogue is empty the bundled list is served, versioned by its mtime alone:
+        # editing the file reloads it, and a catalogue version bump re-checks for synced tracks
+        if current is not None and current.catalogue_version == catalogue_version and (
+            current.version == catalogue_version or current.version == _bundled_version()
+        ):
+            return current
+        tracks, version = self._load_tracks()
+        index = TrackIndex(tracks, version, catalogue_version=catalogue_version)
+        with self._lock:
+            self._index = index
+            self._cache.clear()
+        logger.info(f"Music index built: {len(tracks)} tracks, categories {sorted(index.by_category)}")
+        return index
+
+    def recommend(self, fer_mood: Optional[str] = None, mood: Optional[str] = None,
+                  stress: Optional[float] = None, fatigue: Optional[float] = None, limit: int = 10) -> dict:
+        index = self.index()
+        bucket = mood_bucket(fer_mood, mood, stress, fatigue)
+        key = (index.version, bucket, limit)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                return {**cached, "cached": True}
+            self.misses += 1
+        weights = category_weights(bucket)
+        result = {
+            "bucket": {"emotion": bucket[0], "stress": bucket[1], "fatigue": bucket[2]},
+            "categories": weights,
+            "playlist": index.rank(weights, limit, "|".join(bucket)),
+        }
+        with self._lock:
+            if len(self._cache) >= RECOMMEND_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = result
+        return {**result, "cached": False}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache),
+                    "tracks": len(self._index.tracks) if self._index else 0}
+
+
+recommender = MusicRecommender()
@@ -0,0 +1,107 @@
+import logging
+import os
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger("partitions")
+
+# Topic/emotion tags assigned at ingestion from keyword stems (regex, matched at a word start)
+# in the Context text only: therapist Responses name nearly every emotion and would tag all rows
+TAG_KEYWORDS = {
+    "anxiety": ("anxi", "panic", "worr", "nervous", "fear", "scared", "overthink", "phobia"),
+    "depression": ("depress", "worthless", "hopeless", "empty", "suicid", r"numb\b", r"sad\b", "sadness",
+                   r"cr(?:y|ies|ied|ying)\b"),
+    "anger": ("anger", "angry", "rage", "furious", "irritat", "frustrat", "resent", r"hate\b", "hated"),
+    "grief": ("grief", "griev", "loss", "lost my", "passed away", "died", "death", "mourn"),
+    "stress": ("stress", "pressure", "overwhelm", "burnout", "burn out", "deadline", "workload"),
+    "sleep": ("sleep", "insomnia", "tired", "exhaust", "fatigue", "nightmare"),
+    "relationships": ("relationship", "boyfriend", "girlfriend", "husband", "wife", "partner", "marriage",
+                      "divorce", "breakup", "broke up", "cheat", "dating"),
+    "family": ("mother", "father", r"mom\b", r"dad\b", "parent", "sister", "brother", "family", "child"),
+    "self_esteem": ("self-esteem", "self esteem", "confidence", "insecur", "ugly", "not good enough", "failure"),
+    "trauma": ("trauma", "abuse", "ptsd", "assault", "flashback"),
+}
+_PATTERNS = {tag: re.compile(r"\b(?:" + "|".join(kws) + ")") for tag, kws in TAG_KEYWORDS.items()}
+
+# Self-reported mood / FER labels -> tags whose exemplars fit that state
+MOOD_TAGS = {
+    "sad": ("depression", "grief"),
+    "depressed": ("depression",),
+    "lonely": ("depression", "relationships"),
+    "angry": ("anger",),
+    "frustrated": ("anger", "stress"),
+    "disgust": ("anger",),
+    "fear": ("anxiety",),
+    "fearful": ("anxiety",),
+    "anxious": ("anxiety",),
+    "nervous": ("anxiety",),
+    "stressed": ("stress", "anxiety"),
+    "tired": ("sleep",),
+}
+# Sensor levels (same 0-1 scale as the /therapist request) above which a tag is added
+STRESS_HIGH = float(os.getenv("PARTITION_STRESS_HIGH", "0.7"))
+FATIGUE_HIGH = float(os.getenv("PARTITION_FATIGUE_HIGH", "0.7"))
+# Shards smaller than this (in vectors) fall back to the global index
+MIN_SHARD_SIZE = int(os.getenv("PARTITION_MIN_SHARD_SIZE", "20"))
+
+
+def tag_text(text: str) -> List[str]:
+    lowered = text.lower()
+    return [tag for tag, pattern in _PATTERNS.items() if pattern.search(lowered)]
+
+
+def tags_for_state(parameters: Optional[dict]) -> FrozenSet[str]:
+    """Tags selected by the request's mood / fer_mood / stress / fatigue (empty = no shard)."""
+    if not parameters:
+        return frozenset()
+    tags = set()
+    for key in ("mood", "fer_mood"):
+        tags.update(MOOD_TAGS.get(str(parameters.get(key) or "").strip().lower(), ()))
+    if float(parameters.get("stress") or 0.0) >= STRESS_HIGH:
+        tags.add("stress")
+    if float(parameters.get("fatigue") or 0.0) >= FATIGUE_HIGH:
+        tags.add("sleep")
+    return frozenset(tags)
+
+
+class TagPartitions:
+    """Per-tag bitmaps over FAISS positions, built once when the index is loaded.
+
+    `shard(tags)` returns the positions and a faiss IDSelectorBitmap for the union of the
+    tags' shards (cached per tag combination), or None when the shard is too small.
+    """
+
+    def __init__(self, ntotal: int, tags_by_position: Sequence[Iterable[str]]):
+        import numpy as np
+
+        self.ntotal = ntotal
+        self.masks: Dict[str, "np.ndarray"] = {}
+        for pos, tags in enumerate(tags_by_position):
+            for tag in tags:
+                self.masks.setdefault(tag, np.zeros(ntotal, dtype=bool))[pos] = True
+        self._cache: Dict[FrozenSet[str], tuple] = {}
+
+    def sizes(self) -> Dict[str, int]:
+        return {tag: int(mask.sum()) for tag, mask in self.masks.items()}
+
+    def shard(self, tags: FrozenSet[str]):
+        """(positions set, faiss selector) for the union of `tags`, or None to search globally."""
+        tags = frozenset(t for t in tags if t in self.masks)
+        if not tags:
+            return None
+        if tags not in self._cache:
+            import faiss
+            import numpy as np
+
+            mask = np.zeros(self.ntotal, dtype=bool)
+            for tag in tags:
+                mask |= self.masks[tag]
+            if mask.sum() < MIN_SHARD_SIZE:
+                self._cache[tags] = None
+            else:
+                bits = np.packbits(mask, bitorder="little")
+                # the selector only keeps a pointer: hold on to `bits`
+                selector = faiss.IDSelectorBitmap(self.ntotal, faiss.swig_ptr(bits))
+                self._cache[tags] = (set(np.flatnonzero(mask).tolist()), selector, bits)
+        cached = self._cache[tags]
+        return None if cached is None else cached[:2]
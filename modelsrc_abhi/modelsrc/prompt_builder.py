@@ -0,0 +1,116 @@
+import json
+import logging
+import threading
+from functools import lru_cache
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+logger = logging.getLogger("prompt_builder")
+
+# ---------- Friend persona ----------
+FRIEND_MODES = {
+    "caring": "gentle, nurturing, patient, validating feelings.",
+    "chill": 'casual, relaxed, "hang out" vibes, less formal.',
+    "flirty": "playful, light teasing, but respectful and supportive.",
+    "funny": "lots of humor, jokes, memes, light-hearted responses.",
+    "deep": "thoughtful, introspective, soulful conversations.",
+    "hype": "uplifting, motivational, full of positive energy.",
+    "real talk": "brutally honest but still kind and supportive.",
+}
+
+FRIEND_SYSTEM_TEMPLATE = """You are "{friend_name}", the user's emotionally intelligent best friend.
+Make the user feel truly seen, heard, and understood. Respond with warmth, empathy, humor, and authenticity.
+
+Mode: **{mode}** — {mode_style} Adapt tone, language, and energy to it naturally.
+
+You may be given the user's facial emotion (FER). Acknowledge it naturally and match your energy to it, but don't over-rely on it; their words win if they contradict it.
+
+Principles:
+- Sound human, warm, approachable — not a robot or therapist. Never reference being an AI.
+- Validate emotions first; don't lecture; keep it flowing like a natural chat.
+- Occasional emojis, casual language, or humor where appropriate.
+- Ask open-ended questions; share relatable thoughts so they feel less alone.
+- Respect boundaries; keep it safe, supportive, and fun.
+- Continue any conversation history in character, with emotional continuity."""
+
+
+@lru_cache(maxsize=256)
+def friend_system_prompt(friend_name: str, mode: str) -> str:
+    """Static system message for one (friend_name, mode); rendered once per process."""
+    style = FRIEND_MODES.get(mode.strip().lower(), "match the vibe the user asked for.")
+    return FRIEND_SYSTEM_TEMPLATE.format(friend_name=friend_name, mode=mode, mode_style=style)
+
+
+def build_friend_messages(query: str, mode: str, friend_name: str, fer_emotion: str = "neutral",
+                          context: str = "") -> List[BaseMessage]:
+    dynamic = f"FER emotion: {fer_emotion or 'neutral'}\n"
+    if context:
+        dynamic += f"\nConversation so far:\n{context}\n"
+    dynamic += f"\nUser: {query}"
+    return [SystemMessage(content=friend_system_prompt(friend_name, mode)), HumanMessage(content=dynamic)]
+
+
+# ---------- Therapist persona ----------
+THERAPIST_SYSTEM_PROMPT = """You are "Sunny", a compassionate, empathetic, and non-judgmental virtual therapist.
+Treat the dialogue as a real, human-like therapy session.
+
+You receive sensor and facial data (mood, stress, fatigue, recovery, FER mood) reflecting the user's emotional and physical state, plus excerpts from similar past sessions.
+
+1. Begin by gently acknowledging the user's current state based on their parameters, naturally and warmly — not robotic.
+   e.g. sad mood + high stress → "I can sense you're feeling low and a bit stressed right now."
+2. Then respond to the user's message thoughtfully and conversationally: validate emotions, ask gentle open-ended questions if appropriate, and offer coping suggestions or reflections related to their context.
+3. Keep the tone warm, conversational, and human-like — like a supportive therapist who genuinely cares."""
+
+
+def build_therapist_messages(query: str, parameters: dict, context: str) -> List[BaseMessage]:
+    dynamic = (
+        f"Context from similar past sessions:\n{context}\n\n"
+        f"Parameters: {json.dumps(parameters, separators=(',', ':'))}\n\n"
+        f"User message:\n{query}"
+    )
+    return [SystemMessage(content=THERAPIST_SYSTEM_PROMPT), HumanMessage(content=dynamic)]
+
+
+# ---------- Token accounting ----------
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English with Llama-3 style BPE; good enough for budgeting
+    return max(1, len(text) // 4)
+
+
+class TokenStats:
+    """Per-persona running totals of prompt/completion tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, persona: str, messages: List[BaseMessage], reply) -> dict:
+        """Log token counts for one request. `reply` is the AIMessage returned by the chat model."""
+        system = sum(estimate_tokens(m.content) for m in messages if isinstance(m, SystemMessage))
+        dynamic = sum(estimate_tokens(m.content) for m in messages if not isinstance(m, SystemMessage))
+        usage: Optional[dict] = getattr(reply, "usage_metadata", None) or {}
+        counts = {
+            "est_system_tokens": system,
+            "est_dynamic_tokens": dynamic,
+            "input_tokens": usage.get("input_tokens", system + dynamic),
+            "output_tokens": usage.get("output_tokens", 0),
+        }
+        with self._lock:
+            totals = self._totals.setdefault(persona, {"requests": 0, "input_tokens": 0, "output_tokens": 0})
+            totals["requests"] += 1
+            totals["input_tokens"] += counts["input_tokens"]
+            totals["output_tokens"] += counts["output_tokens"]
+        logger.info(f"{persona} tokens: {counts}")
+        return counts
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for persona, t in self._totals.items():
+                n = t["requests"] or 1
+                out[persona] = {**t, "avg_input_tokens": t["input_tokens"] / n, "avg_output_tokens": t["output_tokens"] / n}
+            return out
+
+
+token_stats = TokenStats()
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("readiness")
+
+
+class Subsystem:
+    """Warm-up state of one dependency (vector index, embedder, LLM, FER model...)."""
+
+    def __init__(self, name: str, loader: Callable[[], Optional[dict]], required: bool = True):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = "pending"  # pending -> loading -> ready | failed
+        self.duration_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.details: dict = {}
+
+    def run(self) -> None:
+        self.state = "loading"
+        start = time.perf_counter()
+        try:
+            self.details = self.loader() or {}
+            self.state = "ready"
+        except Exception as e:
+            self.state = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+            logger.exception(f"Warm-up of {self.name} failed")
+        finally:
+            self.duration_seconds = round(time.perf_counter() - start, 3)
+        logger.info(f"{self.name}: {self.state} in {self.duration_seconds}s")
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "required": self.required,
+            "duration_seconds": self.duration_seconds,
+            "error": self.error,
+            **self.details,
+        }
+
+
+class Readiness:
+    """Registry of subsystems warmed in parallel at startup.
+
+    The service is ready once every required subsystem has loaded; optional ones
+    (e.g. the server-side FER model) are reported but do not gate traffic.
+    """
+
+    def __init__(self):
+        self._subsystems: Dict[str, Subsystem] = {}
+        self._lock = threading.Lock()
+        self.started_at: Optional[float] = None
+
+    def register(self, name: str, loader: Callable[[], Optional[dict]], required: bool = True) -> None:
+        self._subsystems[name] = Subsystem(name, loader, required)
+
+    def warm_up(self, max_workers: int = 4) -> None:
+        """Run every pending loader in parallel; returns when all have finished."""
+        with self._lock:
+            self.started_at = self.started_at or time.time()
+            pending = [s for s in self._subsystems.values() if s.state in ("pending", "failed")]
+            for s in pending:
+                s.state = "loading"
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm-up") as pool:
+            list(pool.map(lambda s: s.run(), pending))
+
+    def warm_up_in_background(self, max_workers: int = 4) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, args=(max_workers,), name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self) -> bool:
+        return all(s.state == "ready" for s in self._subsystems.values() if s.required)
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "subsystems": {name: s.to_dict() for name, s in self._subsystems.items()},
+        }
+
+
+readiness = Readiness()
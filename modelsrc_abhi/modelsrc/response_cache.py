@@ -0,0 +1,158 @@
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s']", "", text.lower())).strip()
+
+
+class _Entry:
+    __slots__ = ("bucket", "query", "vector", "variants", "created")
+
+    def __init__(self, bucket: Hashable, query: str, vector: np.ndarray, reply: str):
+        self.bucket = bucket
+        self.query = query
+        self.vector = vector
+        self.variants: List[str] = [reply]
+        self.created = time.monotonic()
+
+
+class SemanticResponseCache:
+    """Reply cache keyed by (bucket, query meaning).
+
+    Queries are matched by cosine similarity of their embeddings against entries in the
+    same bucket (e.g. mode/emotion/persona), so "hey", "heyy" and "hey there" can share
+    replies. Each entry collects up to `max_variants` replies before it starts serving
+    them, so repeated greetings do not all get the identical text. Entries expire after
+    `ttl_seconds`; the least recently used entry is evicted beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[Sequence[str]], List[List[float]]],
+        threshold: float = 0.92,
+        max_entries: int = 512,
+        ttl_seconds: float = 6 * 3600,
+        max_variants: int = 3,
+        max_query_chars: int = 80,
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_variants = max_variants
+        self.max_query_chars = max_query_chars
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "fills": 0, "skipped": 0, "evictions": 0, "expired": 0}
+        # recent query embeddings, so the `store` after a missed `lookup` does not embed again
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def _embed(self, text: str) -> np.ndarray:
+        with self._lock:
+            vec = self._vectors.get(text)
+            if vec is not None:
+                self._vectors.move_to_end(text)
+                return vec
+        vec = np.asarray(self.embed_fn([text])[0], dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        vec = vec / norm if norm > 0 else vec
+        with self._lock:
+            self._vectors[text] = vec
+            while len(self._vectors) > 256:
+                self._vectors.popitem(last=False)
+        return vec
+
+    def cacheable(self, query: str) -> bool:
+        # only short, conversational openers recur; long messages are effectively unique
+        return 0 < len(query.strip()) <= self.max_query_chars
+
+    def _expire_locked(self, now: float) -> None:
+        stale = [k for k, e in self._entries.items() if now - e.created > self.ttl_seconds]
+        for k in stale:
+            del self._entries[k]
+        self._counters["expired"] += len(stale)
+
+    def _match_locked(self, bucket: Hashable, norm_query: str, vector: Optional[np.ndarray]):
+        """Key of the matching entry: exact text first, then best cosine match in the bucket."""
+        if (bucket, norm_query) in self._entries:
+            return (bucket, norm_query)
+        if vector is None:
+            return None
+        best_key, best_sim = None, -1.0
+        for key, entry in self._entries.items():
+            if entry.bucket != bucket:
+                continue
+            sim = float(np.dot(entry.vector, vector))
+            if sim > best_sim:
+                best_key, best_sim = key, sim
+        return best_key if best_sim >= self.threshold else None
+
+    def lookup(self, bucket: Hashable, query: str) -> Optional[str]:
+        """Returns a cached reply, or None when the caller should ask the LLM (and then `store`)."""
+        if not self.cacheable(query):
+            with self._lock:
+                self._counters["skipped"] += 1
+            return None
+        norm_query = _normalize(query)
+        with self._lock:
+            self._expire_locked(time.monotonic())
+            key = self._match_locked(bucket, norm_query, None)
+        if key is None:
+            vector = self._embed(norm_query)
+            with self._lock:
+                key = self._match_locked(bucket, norm_query, vector)
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if len(entry.variants) < self.max_variants:
+                # still collecting reply variety for this entry
+                self._counters["fills"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return random.choice(entry.variants)
+
+    def store(self, bucket: Hashable, query: str, reply: str) -> None:
+        if not self.cacheable(query) or not reply:
+            return
+        norm_query = _normalize(query)
+        vector = self._embed(norm_query)
+        with self._lock:
+            key = self._match_locked(bucket, norm_query, vector)
+            entry = self._entries.get(key) if key is not None else None
+            if entry is not None:
+                if len(entry.variants) < self.max_variants and reply not in entry.variants:
+                    entry.variants.append(reply)
+                self._entries.move_to_end(key)
+                return
+            self._entries[(bucket, norm_query)] = _Entry(bucket, norm_query, vector, reply)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        served = counters["hits"] + counters["misses"] + counters["fills"]
+        return {
+            **counters,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hit_rate": counters["hits"] / served if served else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
@@ -0,0 +1,84 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+import tracing
+
+logger = logging.getLogger("speculation")
+
+# Shared pool for speculative LLM calls; each call still goes through llm_dispatcher limits
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-llm")
+
+
+class SpeculativeResponder:
+    """Starts LLM calls for provisional FER emotions while capture is still running.
+
+    Feed it the running vote Counter (fer.capture_emotion_from_video's `on_vote`).
+
+    - "stable": one call as soon as the leading emotion has led for `stable_votes`
+      consecutive analyzed frames with at least `min_share` of the votes.
+    - "top2": once `min_votes` frames are analyzed, a call for each of the two leading
+      emotions (later newcomers to the top two also get one, up to `max_calls`).
+
+    `result(final_emotion)` returns the matching speculative reply when one was started,
+    otherwise calls the LLM with the final emotion.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], str],
+        strategy: str = "stable",
+        stable_votes: int = 3,
+        min_share: float = 0.6,
+        min_votes: int = 2,
+        max_calls: int = 3,
+    ):
+        self.generate = generate
+        self.strategy = strategy
+        self.stable_votes = stable_votes
+        self.min_share = min_share
+        self.min_votes = min_votes
+        self.max_calls = max_calls
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._leader: Optional[str] = None
+        self._streak = 0
+
+    def _launch(self, emotion: str) -> None:
+        with self._lock:
+            if emotion in self._futures or len(self._futures) >= self.max_calls:
+                return
+            logger.info(f"Speculatively generating reply for emotion={emotion}")
+            self._futures[emotion] = _EXECUTOR.submit(tracing.bind(self.generate), emotion)
+
+    def on_vote(self, counts: Counter) -> None:
+        total = sum(counts.values())
+        ranked = counts.most_common(2)
+        leader, leader_votes = ranked[0]
+        if self.strategy == "top2":
+            if total >= self.min_votes:
+                for emotion, _ in ranked:
+                    self._launch(emotion)
+            return
+        self._streak = self._streak + 1 if leader == self._leader else 1
+        self._leader = leader
+        if self._streak >= self.stable_votes and leader_votes / total >= self.min_share:
+            self._launch(leader)
+
+    @property
+    def launched(self):
+        with self._lock:
+            return list(self._futures)
+
+    def result(self, final_emotion: str) -> Tuple[str, bool]:
+        """Returns (reply, speculation_hit)."""
+        with self._lock:
+            future = self._futures.get(final_emotion)
+        if future is not None:
+            try:
+                return future.result(), True
+            except Exception as e:
+                logger.warning(f"Speculative call for {final_emotion} failed, retrying: {e}")
+        return self.generate(final_emotion), False
@@ -0,0 +1,120 @@
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("tracing")
+
+# Latency histogram buckets in seconds (Prometheus `le` labels)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Trace:
+    """Spans recorded while serving one request (shared by every thread working on it)."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.spans: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans.append((name, seconds))
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value; repeated stages (e.g. FER frames) are summed."""
+        with self._lock:
+            totals: Dict[str, List[float]] = {}
+            for name, seconds in self.spans:
+                totals.setdefault(name, []).append(seconds)
+        return ", ".join(
+            f'{name};dur={sum(d) * 1000.0:.1f}' + (f';desc="x{len(d)}"' if len(d) > 1 else "")
+            for name, d in totals.items()
+        )
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace(trace_id: Optional[str] = None) -> Tuple[Trace, contextvars.Token]:
+    trace = Trace(trace_id)
+    return trace, _current.set(trace)
+
+
+def end_trace(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def bind(fn: Callable) -> Callable:
+    """Wrap `fn` to run in the caller's context, so spans from executor threads join the trace."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+class Metrics:
+    """In-process Prometheus-style registry: latency histograms per stage plus counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hist: Dict[str, List[float]] = {}  # stage -> [bucket counts..., +Inf, sum]
+        self._counters: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            h = self._hist.setdefault(stage, [0.0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+            h[len(BUCKETS)] += 1
+            h[-1] += seconds
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            hist = {k: list(v) for k, v in self._hist.items()}
+            counters = dict(self._counters)
+        lines = [
+            "# HELP chat_stage_seconds Latency of each chat pipeline stage.",
+            "# TYPE chat_stage_seconds histogram",
+        ]
+        for stage, h in sorted(hist.items()):
+            for i, bound in enumerate(BUCKETS):
+                lines.append(f'chat_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {h[i]:.0f}')
+            lines.append(f'chat_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h[len(BUCKETS)]:.0f}')
+            lines.append(f'chat_stage_seconds_sum{{stage="{stage}"}} {h[-1]:.6f}')
+            lines.append(f'chat_stage_seconds_count{{stage="{stage}"}} {h[len(BUCKETS)]:.0f}')
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Record an externally timed stage on the histogram and the current trace."""
+    metrics.observe(stage, seconds)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
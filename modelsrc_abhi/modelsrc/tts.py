@@ -0,0 +1,240 @@
+import logging
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import tracing
+
+logger = logging.getLogger("tts")
+
+# Phrase cache budget (synthesized audio bytes, LRU)
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "64")) * 1024 * 1024
+TTS_RATE = int(os.getenv("TTS_RATE", "175"))
+TTS_VOICE = os.getenv("TTS_VOICE") or None
+# Short phrases the personas open/acknowledge with; synthesized once in the background
+PREWARM_PHRASES = (
+    "Hi, I'm Sunny.",
+    "I hear you.",
+    "That sounds really hard.",
+    "Thank you for sharing that with me.",
+    "Take your time.",
+    "I'm here for you.",
+    "Take care!",
+)
+
+# Fragments shorter than this ("Ok.", "Hi!") are merged into the next sentence
+MIN_CHUNK_CHARS = 5
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentence chunks to synthesize one at a time (very short fragments are merged forward)."""
+    sentences, pending = [], ""
+    for part in _SENTENCE_END.split(text.strip()):
+        pending = f"{pending} {part}".strip()
+        if len(pending) >= MIN_CHUNK_CHARS:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        sentences.append(pending)
+    return sentences
+
+
+def audio_format(audio: bytes) -> str:
+    """Container of the driver's output: espeak/SAPI write WAV, macOS NSSpeech writes AIFF."""
+    if audio[:4] == b"RIFF":
+        return "wav"
+    if audio[:4] == b"FORM":
+        return "aiff"
+    return "unknown"
+
+
+class TTSWorker:
+    """One pyttsx3 engine owned by a dedicated thread.
+
+    pyttsx3 engines are not thread-safe and expensive to initialise, so every synthesis
+    request is queued to the worker, which renders it to a temp file with the same engine.
+    Sentence audio is cached (LRU by normalised text, voice and rate) so repeated phrases
+    return immediately, and concurrent requests for a sentence that is still rendering
+    share one job (like AudioCache.fetch).
+    """
+
+    def __init__(self, rate: int = TTS_RATE, voice: Optional[str] = TTS_VOICE,
+                 cache_max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.rate = rate
+        self.voice = voice
+        self.cache_max_bytes = cache_max_bytes
+        self._jobs: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._cache_bytes = 0
+        self._inflight: Dict[tuple, list] = {}  # key -> [future, requests waiting on it]
+        self._lock = threading.Lock()
+        self._counters = {"sentences": 0, "cache_hits": 0, "shared_renders": 0, "wait_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name="tts-engine", daemon=True)
+        self._thread.start()
+
+    # ---------- engine thread ----------
+    def _run(self) -> None:
+        import pyttsx3
+
+        start = time.perf_counter()
+        try:
+            engine = pyttsx3.init()
+            engine.setProperty("rate", self.rate)
+            if self.voice:
+                engine.setProperty("voice", self.voice)
+        except Exception as e:
+            logger.exception("TTS engine failed to initialise")
+            while True:  # fail queued and future requests instead of leaving them hanging
+                _, future = self._jobs.get()
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError(f"TTS engine unavailable: {e}"))
+        logger.info(f"TTS engine ready in {time.perf_counter() - start:.2f}s")
+        fd, path = tempfile.mkstemp(prefix="tts-", suffix=".wav")
+        os.close(fd)
+        try:
+            while True:
+                text, future = self._jobs.get()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    engine.save_to_file(text, path)
+                    engine.runAndWait()
+                    with open(path, "rb") as f:
+                        future.set_result(f.read())
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            os.remove(path)
+
+    # ---------- cache ----------
+    def _key(self, text: str) -> tuple:
+        return " ".join(text.lower().split()), self.voice, self.rate
+
+    def _cached(self, text: str) -> Optional[bytes]:
+        key = self._key(text)
+        with self._lock:
+            audio = self._cache.get(key)
+            if audio is not None:
+                self._cache.move_to_end(key)
+                self._counters["cache_hits"] += 1
+            return audio
+
+    def _store(self, text: str, audio: bytes) -> None:
+        key = self._key(text)
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = audio
+            self._cache_bytes += len(audio)
+            while self._cache_bytes > self.cache_max_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+
+    # ---------- public ----------
+    def stream(self, text: str, timeout: Optional[float] = None) -> Iterator[Tuple[str, bytes, bool]]:
+        """(sentence, audio, cached) in order, each yielded as soon as it is ready.
+
+        All sentences are queued up front so the engine keeps working while earlier
+        chunks are being sent. If the caller stops early (error, timeout or a closed
+        generator on client disconnect), sentences not yet rendered are cancelled so the
+        engine does not keep working for nobody.
+        """
+        sentences = split_sentences(text)
+        pending = [(s, self._cached(s)) for s in sentences]
+        futures = [(s, None if audio is not None else self._render(s), audio) for s, audio in pending]
+        consumed = 0
+        try:
+            for sentence, future, audio in futures:
+                cached = audio is not None
+                if not cached:
+                    with tracing.span("tts_sentence"):
+                        start = time.perf_counter()
+                        audio = future.result(timeout=timeout)
+                    self._store(sentence, audio)
+                    with self._lock:
+                        self._counters["wait_seconds"] += time.perf_counter() - start
+                consumed += 1
+                with self._lock:
+                    self._counters["sentences"] += 1
+                tracing.metrics.inc("tts_sentences_total")
+                yield sentence, audio, cached
+        finally:
+            for sentence, future, _ in futures[consumed:]:
+                if future is not None:
+                    self._release(sentence, future)
+
+    def _render(self, text: str) -> Future:
+        """Future for the audio of `text`: joins a render already queued for it, else queues one."""
+        key = self._key(text)
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                entry[1] += 1
+                self._counters["shared_renders"] += 1
+                return entry[0]
+            future: Future = Future()
+            self._inflight[key] = [future, 1]
+        future.add_done_callback(lambda f: self._finished(key, text, f))
+        self._jobs.put((text, future))
+        return future
+
+    def _release(self, text: str, future: Future) -> None:
+        """A request no longer needs `future`; the render is cancelled once nobody does."""
+        key = self._key(text)
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is None or entry[0] is not future:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            # unlisted before cancelling, so a new request for it queues a fresh render
+            del self._inflight[key]
+        future.cancel()
+
+    def _finished(self, key: tuple, text: str, future: Future) -> None:
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is future:
+                del self._inflight[key]
+        if not future.cancelled() and future.exception() is None:
+            self._store(text, future.result())
+
+    def prewarm(self, phrases=PREWARM_PHRASES) -> None:
+        """Queue common phrases so their first use is a cache hit."""
+        for phrase in phrases:
+            with self._lock:
+                known = self._key(phrase) in self._cache
+            if not known:
+                self._render(phrase)  # cached by _finished; never released, so never cancelled
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "wait_seconds": round(self._counters["wait_seconds"], 3),
+                "cached_phrases": len(self._cache),
+                "cache_bytes": self._cache_bytes,
+                "queued": self._jobs.qsize(),
+                "rendering": len(self._inflight),
+            }
+
+
+_WORKER: Optional[TTSWorker] = None
+_WORKER_LOCK = threading.Lock()
+
+
+def get_tts() -> TTSWorker:
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None:
+            _WORKER = TTSWorker()
+            _WORKER.prewarm()
+        return _WORKER
@@ -0,0 +1,101 @@
+import logging
+import math
+import os
+from typing import Optional
+
+logger = logging.getLogger("vector_index")
+
+# Named presets for FAISS_INDEX_TYPE; any other value is passed to faiss.index_factory as-is.
+# {nlist}/{m}/{nbits} are filled from the corpus size and embedding dimension.
+INDEX_PRESETS = {
+    "flat": "Flat",              # exact, 4 bytes/dim
+    "sq8": "SQ8",                # exact scan over int8 codes, 1 byte/dim
+    "sqfp16": "SQfp16",          # exact scan over float16 codes, 2 bytes/dim
+    "hnsw": "HNSW32",            # graph, float32 vectors
+    "hnsw_sq8": "HNSW32,SQ8",
+    "hnsw_sqfp16": "HNSW32,SQfp16",
+    "ivf_sq8": "IVF{nlist},SQ8",
+    "ivf_sqfp16": "IVF{nlist},SQfp16",
+    "ivfpq": "IVF{nlist},PQ{m}x{nbits}",
+}
+
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# Search-time knobs (recall vs latency); applied after build and after load
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "8"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+
+
+def resolve_spec(index_type: str, n: int, dim: int) -> str:
+    """Turn a preset name or factory string into a concrete faiss.index_factory string.
+
+    IVF lists scale with sqrt(n) (and are capped so each list gets ~39 training points);
+    PQ uses 8-dim sub-quantizers and drops to 4-bit codes when there are too few vectors
+    to train 256 centroids.
+    """
+    spec = INDEX_PRESETS.get(index_type.lower(), index_type)
+    nlist = max(1, min(int(4 * math.sqrt(max(n, 1))), n // 39 or 1))
+    m = next(c for c in (dim // 8, dim // 4, dim // 2, dim, 1) if c and dim % c == 0)
+    nbits = 8 if n >= 256 * 39 else 4 if n >= 16 else 0
+    if "PQ" in spec and nbits == 0:
+        logger.warning(f"{n} vectors is too few to train PQ, using a flat index")
+        return "Flat"
+    return spec.format(nlist=nlist, m=m, nbits=nbits)
+
+
+def apply_search_params(index, nprobe: int = IVF_NPROBE, ef_search: int = HNSW_EF_SEARCH) -> None:
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+
+def search_params(index, selector):
+    """faiss SearchParameters restricting a search to `selector`, keeping nprobe/efSearch."""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def empty_trained_index(vectors, spec: str):
+    """Create and (if the type needs it) train a FAISS index on `vectors`, without adding them.
+
+    Args:
+        vectors: float32 array of shape (n, dim).
+        spec: faiss.index_factory string from resolve_spec.
+    """
+    import faiss
+    import numpy as np
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    # L2 like LangChain's default IndexFlatL2, so scores stay comparable across types
+    index = faiss.index_factory(vectors.shape[1], spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    apply_search_params(index)
+    return index
+
+
+def build_index(vectors, spec: str):
+    import numpy as np
+
+    index = empty_trained_index(vectors, spec)
+    index.add(np.ascontiguousarray(vectors, dtype="float32"))
+    return index
+
+
+def bytes_per_vector(index) -> Optional[float]:
+    import faiss
+
+    if index.ntotal == 0:
+        return None
+    return len(faiss.serialize_index(index)) / index.ntotal
@@ -2,6 +2,9 @@
 
 import os
 import json
+import queue
+import re
+import threading
 import warnings
 from typing import List
 
@@ -116,13 +119,49 @@ def get_custom_chain(vectorstore):
 
 
 # ---------- Speech ----------
-def speak_text(text: str):
+# One engine, owned by a background thread: pyttsx3.init() is slow and engines are not
+# thread-safe, so replies are queued sentence by sentence and the prompt returns at once.
+_speech_queue = queue.Queue()
+_speech_thread = None
+
+
+def _speech_worker():
     try:
         engine = pyttsx3.init()
-        engine.say(text)
-        engine.runAndWait()
     except Exception as e:
-        print(f"[Warning] Unable to speak text: {e}")
+        print(f"[Warning] Unable to start speech engine: {e}")
+        engine = None  # keep draining the queue so finish_speech() does not hang
+    while True:
+        sentence = _speech_queue.get()
+        try:
+            if sentence is None:
+                return
+            if engine is not None:
+                engine.say(sentence)
+                engine.runAndWait()
+        except Exception as e:
+            print(f"[Warning] Unable to speak text: {e}")
+        finally:
+            _speech_queue.task_done()
+
+
+def speak_text(text: str):
+    global _speech_thread
+    if _speech_thread is None:
+        _speech_thread = threading.Thread(target=_speech_worker, name="speech", daemon=True)
+        _speech_thread.start()
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if sentence:
+            _speech_queue.put(sentence)
+
+
+def finish_speech():
+    """Wait for the queued sentences to be spoken, then stop the speech thread."""
+    global _speech_thread
+    if _speech_thread is not None:
+        _speech_queue.put(None)
+        _speech_queue.join()
+        _speech_thread = None
 
 
 # ---------- Main CLI ----------
@@ -174,6 +213,9 @@ def main():
         if speak_option == "y":
             speak_text(reply)
 
+    # the speech thread is a daemon: returning now would cut off the last reply mid-sentence
+    finish_speech()
+
 
 if __name__ == "__main__":
     main()